@@ -0,0 +1,238 @@
+# analytics.py
+"""
+Running summaries of the run log (for statistic_data.py and report.py).
+
+RunAnalytics reads runs.db once and, after that, only the rows logged since
+the last refresh(). New rows are decoded into typed arrays (Class and
+Miniboss_Killed as small integer codes into a category list) and added into
+summary tables, saved in ANALYTICS_DIR: runs per (class, second played),
+wins per class, runs per miniboss result and runs per (level, second played).
+
+Every chart is drawn from those tables: the play-time histogram, the exact
+box-plot quartiles and whiskers, the bar counts and the win rates cost the
+same with 50 runs or 10M. Play time and level are whole numbers, so a count
+per value loses nothing.
+"""
+import json
+import os
+from os.path import join, exists
+
+import numpy as np
+
+from settings import ANALYTICS_DIR, RUNS_CSV
+from runstore import RunStore
+
+COLUMNS = {                      # column -> dtype while a batch is decoded
+    'Play_Time_Sec': np.int32,
+    'Class': np.int16,           # code into categories['Class']
+    'Level': np.int16,
+    'Miniboss_Killed': np.int16,  # code into categories['Miniboss_Killed']
+    'Beat_Final_Boss': np.int8,
+}
+SUMMARY_FILE = 'summary.npz'
+
+
+def _grow(table, shape):
+    """table zero-padded to at least shape."""
+    if all(have >= need for have, need in zip(table.shape, shape)):
+        return table
+    grown = np.zeros([max(have, need) for have, need in zip(table.shape, shape)], np.int64)
+    grown[tuple(slice(0, n) for n in table.shape)] = table
+    return grown
+
+
+def _count(codes, size):
+    return np.bincount(codes, minlength=size).astype(np.int64)
+
+
+def percentiles(counts, qs):
+    """np.percentile (linear) of the data where counts[v] runs have value v."""
+    cum = np.cumsum(counts)
+    n = int(cum[-1]) if len(cum) else 0
+    if not n:
+        return [np.nan] * len(qs)
+    out = []
+    for q in qs:
+        pos = q / 100 * (n - 1)
+        lo = int(np.floor(pos))
+        a = int(np.searchsorted(cum, lo, side='right'))
+        b = int(np.searchsorted(cum, min(lo + 1, n - 1), side='right'))
+        out.append(a + (b - a) * (pos - lo))
+    return out
+
+
+def box_stats(counts, label=None, whis=1.5):
+    """
+    matplotlib.cbook.boxplot_stats from value counts, for Axes.bxp.
+    Fliers are listed once per value (the markers would overlap anyway).
+    """
+    values = np.flatnonzero(counts)
+    if not len(values):
+        return None
+    weights = counts[values]
+    q1, med, q3 = percentiles(counts, (25, 50, 75))
+    iqr = q3 - q1
+    low, high = values[values >= q1 - whis * iqr], values[values <= q3 + whis * iqr]
+    whislo = q1 if not len(low) or low.min() > q1 else low.min()
+    whishi = q3 if not len(high) or high.max() < q3 else high.max()
+    return {'label': label, 'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr,
+            'whislo': whislo, 'whishi': whishi,
+            'mean': float(np.dot(values, weights) / weights.sum()),
+            'fliers': values[(values < whislo) | (values > whishi)]}
+
+
+class RunAnalytics:
+    def __init__(self, store=None, cache_dir=ANALYTICS_DIR):
+        # the game's own log (as Game opens it) unless told otherwise
+        self.store = store if store is not None else RunStore(legacy_csv=RUNS_CSV)
+        self.cache_dir = cache_dir
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.identity = None  # RunStore.identity() of the database cached here
+        self.rows = 0
+        self.last_id = 0  # runs.db id of the newest row taken in
+        self.categories = {'Class': [], 'Miniboss_Killed': []}
+        self.time_by_class = np.zeros((0, 0), np.int64)  # [class, seconds] -> runs
+        self.wins_by_class = np.zeros(0, np.int64)        # [class] -> victories
+        self.miniboss_counts = np.zeros(0, np.int64)      # [miniboss result] -> runs
+        self.level_time = np.zeros((0, 0), np.int64)     # [level, seconds] -> runs
+
+    @property
+    def version(self):
+        """Changes whenever refresh() takes in new rows."""
+        return self.last_id
+
+    # ---------- cache files ----------
+    def _path(self, name):
+        return join(self.cache_dir, name)
+
+    def _load(self):
+        path = self._path(SUMMARY_FILE)
+        if not exists(path):
+            return
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            tables = {k: data[k] for k in ('time_by_class', 'wins_by_class',
+                                           'miniboss_counts', 'level_time')}
+        self.identity = meta.get('identity')
+        self.rows, self.last_id = meta['rows'], meta['last_id']
+        self.categories = meta['categories']
+        self.__dict__.update(tables)
+
+    def _save(self):
+        meta = {'identity': self.identity, 'rows': self.rows, 'last_id': self.last_id,
+                'categories': self.categories}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(SUMMARY_FILE)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, meta=json.dumps(meta), time_by_class=self.time_by_class,
+                     wins_by_class=self.wins_by_class, miniboss_counts=self.miniboss_counts,
+                     level_time=self.level_time)
+        os.replace(tmp, path)
+
+    # ---------- updates ----------
+    def refresh(self):
+        """Take in the runs logged since the last refresh; returns how many."""
+        identity = self.store.identity()
+        if self.rows and (identity != self.identity
+                          or self.store.count_upto(self.last_id) != self.rows):
+            self._reset()  # another or a rebuilt database: start over
+        self.identity = identity
+        added = 0
+        for rows in self.store.fetch_since(self.last_id):
+            self._append(rows)
+            added += len(rows)
+        if added:
+            self._save()
+        return added
+
+    def _codes(self, column, values):
+        cats = self.categories[column]
+        index = {v: i for i, v in enumerate(cats)}
+        for v in values:
+            if v not in index:
+                index[v] = len(cats)
+                cats.append(v)
+        return np.array([index[v] for v in values], COLUMNS[column])
+
+    def _append(self, rows):
+        ids, _players, secs, jobs, levels, minibosses, wins = zip(*rows)
+        cols = {
+            'Play_Time_Sec': np.array(secs, COLUMNS['Play_Time_Sec']),
+            'Class': self._codes('Class', jobs),
+            'Level': np.array(levels, COLUMNS['Level']),
+            'Miniboss_Killed': self._codes('Miniboss_Killed', minibosses),
+            'Beat_Final_Boss': np.array(wins, COLUMNS['Beat_Final_Boss']),
+        }
+        t = cols['Play_Time_Sec'].astype(np.int64)
+        c = cols['Class'].astype(np.int64)
+        lv = cols['Level'].astype(np.int64)
+        width = int(t.max()) + 1
+        classes = len(self.categories['Class'])
+
+        self.time_by_class = _grow(self.time_by_class, (classes, width))
+        w = self.time_by_class.shape[1]
+        self.time_by_class += _count(c * w + t, self.time_by_class.size).reshape(-1, w)
+        self.wins_by_class = _grow(self.wins_by_class, (classes,))
+        self.wins_by_class += _count(c[cols['Beat_Final_Boss'] == 1], len(self.wins_by_class))
+        self.miniboss_counts = _grow(self.miniboss_counts, (len(self.categories['Miniboss_Killed']),))
+        self.miniboss_counts += _count(cols['Miniboss_Killed'], len(self.miniboss_counts))
+        self.level_time = _grow(self.level_time, (int(lv.max()) + 1, width))
+        w = self.level_time.shape[1]
+        self.level_time += _count(lv * w + t, self.level_time.size).reshape(-1, w)
+
+        self.rows += len(rows)
+        self.last_id = ids[-1]
+
+    # ---------- reads ----------
+    def counts(self, column):
+        """[(value, runs)], most common first (like Series.value_counts)."""
+        if column == 'Class':
+            values, runs = self.categories['Class'], self.time_by_class.sum(axis=1)
+        elif column == 'Miniboss_Killed':
+            values, runs = self.categories['Miniboss_Killed'], self.miniboss_counts
+        elif column == 'Beat_Final_Boss':
+            won = int(self.wins_by_class.sum())
+            values, runs = (0, 1), (self.rows - won, won)
+        else:
+            raise ValueError(f"no counts kept for {column!r}")
+        pairs = [(v, int(n)) for v, n in zip(values, runs) if n]
+        return sorted(pairs, key=lambda p: -p[1])
+
+    def time_counts(self, job=None):
+        """[seconds] -> runs, for one class or all of them."""
+        if job is None:
+            return self.time_by_class.sum(axis=0)
+        return self.time_by_class[self.categories['Class'].index(job)]
+
+    def time_histogram(self, bins=10):
+        """np.histogram(Play_Time_Sec, bins) -> (runs per bin, bin edges)."""
+        counts = self.time_counts()
+        values = np.flatnonzero(counts)
+        return np.histogram(values, bins, weights=counts[values])
+
+    def time_box(self, job=None):
+        return box_stats(self.time_counts(job), job)
+
+    def win_rates(self):
+        """[(class, runs, wins, win rate)] in class name order."""
+        runs = self.time_by_class.sum(axis=1)
+        return [(job, int(runs[i]), int(self.wins_by_class[i]), float(self.wins_by_class[i] / runs[i]))
+                for i, job in sorted(enumerate(self.categories['Class']), key=lambda p: p[1])
+                if runs[i]]
+
+    def level_time_cells(self, time_bin=1):
+        """
+        (levels, seconds, runs) of every (level, play time) pair that occurs.
+        time_bin > 1 merges play times into bins that wide (seconds = bin centre).
+        """
+        table = self.level_time
+        if time_bin > 1:
+            width = -(-table.shape[1] // time_bin) * time_bin
+            table = _grow(table, (table.shape[0], width))
+            table = table.reshape(table.shape[0], -1, time_bin).sum(axis=2)
+        levels, bins = np.nonzero(table)
+        return levels, bins * time_bin + (time_bin - 1) / 2, table[levels, bins]
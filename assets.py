@@ -0,0 +1,262 @@
+# assets.py
+import os, math, json
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join, normpath, getmtime
+import pygame
+from settings import PROJECTILE_ANGLE_BUCKETS, ATLAS_DIR
+
+# (asset path, state, scale) -> list[Surface]
+# The lists are shared by every sprite that asks for them, so never
+# mutate them in place - assign a new list instead.
+_frame_cache: dict[tuple[str, str, float], list[pygame.Surface]] = {}
+
+
+def numeric_pngs(folder):
+    """Return the N.png files of an animation folder sorted by frame number."""
+    if not os.path.isdir(folder):
+        return []
+    return sorted([
+        f for f in os.listdir(folder)
+        if f.endswith('.png') and f.rsplit('.', 1)[0].isdigit()
+    ], key=lambda x: int(x.split('.')[0]))
+
+
+def frame_files(folder):
+    """state -> frame paths, for every state folder that has N.png frames."""
+    states = {}
+    if not os.path.isdir(folder):
+        return states
+    for state in sorted(os.listdir(folder)):
+        files = numeric_pngs(join(folder, state))
+        if files:
+            states[state] = [join(folder, state, f) for f in files]
+    return states
+
+
+def read_frames(path, state, scale=2.0):
+    """
+    Decode and scale the N.png frames of path/state, not yet converted to the
+    display format (convert_alpha is left to the main thread).
+    """
+    folder = join(path, state)
+    frames = []
+    for f in numeric_pngs(folder):
+        surf = pygame.image.load(join(folder, f))
+        w, h = int(surf.get_width() * scale), int(surf.get_height() * scale)
+        frames.append(pygame.transform.scale(surf, (w, h)))
+    return frames
+
+
+def load_frames(path, state, scale=2.0):
+    """
+    Return the animation frames of path/state, decoding them only once.
+    Uses the character's atlas when build_assets.py made one at this scale,
+    otherwise decodes and scales the N.png files one by one.
+    """
+    key = (path, state, scale)
+    frames = _frame_cache.get(key)
+    if frames is None:
+        if preloader.wait(path):  # being decoded in the background already
+            frames = _frame_cache.get(key)
+            if frames is not None:
+                return frames
+        atlas = load_atlas(path)
+        if atlas is not None and atlas.scale == scale:
+            frames = atlas.frames(state)
+        else:
+            frames = [surf.convert_alpha() for surf in read_frames(path, state, scale)]
+        _frame_cache[key] = frames
+    return frames
+
+
+def warm_up(paths, states, scale=2.0):
+    """Decode every (path, state) pair up front so spawning never hits the disk."""
+    for path in paths:
+        for state in states:
+            load_frames(path, state, scale)
+
+
+# ---------- Atlases ----------
+# build_assets.py packs every frame of a character into ATLAS_DIR/<name>.png
+# with a <name>.json manifest (rects are in unscaled sheet pixels):
+#     {"version", "source", "scale", "image", "frames", "states": {state: [[x, y, w, h], ...]}}
+ATLAS_VERSION = 1
+
+# character path -> Atlas, or None when it has no atlas
+_atlas_cache: dict[str, 'Atlas | None'] = {}
+
+
+def atlas_name(path):
+    """File name (no extension) of the atlas of a character folder."""
+    return normpath(path).replace(os.sep, '.').replace(' ', '_')
+
+
+class Atlas:
+    """One decoded sheet, already scaled; every frame is a subsurface of it."""
+    def __init__(self, manifest, sheet):
+        self.scale = manifest['scale']  # whole number
+        self.sheet = sheet
+        self.states = manifest['states']
+
+    def frames(self, state):
+        s = self.scale
+        return [self.sheet.subsurface((x * s, y * s, w * s, h * s))
+                for x, y, w, h in self.states.get(state, [])]
+
+
+def atlas_current(manifest, manifest_path, sources, scale=None):
+    """
+    True if the atlas still matches its frames: same format (and scale, if
+    given), same number of frames and none edited since it was built.
+    """
+    built = getmtime(manifest_path)
+    return (manifest.get('version') == ATLAS_VERSION
+            and (scale is None or manifest.get('scale') == scale)
+            and manifest.get('frames') == len(sources)
+            and all(getmtime(p) <= built for p in sources))
+
+
+def read_atlas(path):
+    """
+    (manifest, scaled sheet) of the atlas of a character folder, sheet not yet
+    converted; None if there is none or its frames changed since the build
+    (they are then read one by one until build_assets.py runs again).
+    """
+    manifest_path = join(ATLAS_DIR, atlas_name(path) + '.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    sources = [p for paths in frame_files(path).values() for p in paths]
+    if not atlas_current(manifest, manifest_path, sources):
+        return None
+    sheet = pygame.image.load(join(ATLAS_DIR, manifest['image']))
+    s = manifest['scale']
+    return manifest, pygame.transform.scale(sheet, (sheet.get_width() * s, sheet.get_height() * s))
+
+
+def load_atlas(path):
+    """The Atlas built for a character folder, or None if there is none."""
+    if path not in _atlas_cache:
+        data = read_atlas(path)
+        _atlas_cache[path] = Atlas(data[0], data[1].convert_alpha()) if data else None
+    return _atlas_cache[path]
+
+
+# ---------- Background preloading ----------
+class Preloader:
+    """
+    Decodes whole animation sets on a worker thread ahead of time.
+    The worker only reads and scales; collect() (main thread) converts the
+    results and puts them in the frame cache, so load_frames() later finds
+    them there. load_frames() on a set that is still in flight waits for it
+    instead of decoding it a second time.
+    """
+    def __init__(self):
+        self.pool = None
+        self.pending = {}  # path -> (states, scale, Future)
+
+    def request(self, path, states, scale=2.0):
+        states = [st for st in states if (path, st, scale) not in _frame_cache]
+        if not states or path in self.pending:
+            return
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preload')
+        self.pending[path] = (states, scale, self.pool.submit(self._read, path, states, scale))
+
+    @staticmethod
+    def _read(path, states, scale):
+        atlas = None if path in _atlas_cache else read_atlas(path)
+        if atlas is not None and atlas[0]['scale'] == scale:
+            return atlas, None
+        return atlas, {st: read_frames(path, st, scale) for st in states}
+
+    def _install(self, path):
+        states, scale, future = self.pending.pop(path)
+        atlas, frames = future.result()
+        if path not in _atlas_cache:
+            _atlas_cache[path] = Atlas(atlas[0], atlas[1].convert_alpha()) if atlas else None
+        for st in states:
+            key = (path, st, scale)
+            if key not in _frame_cache:
+                if frames is None:
+                    _frame_cache[key] = _atlas_cache[path].frames(st)
+                else:
+                    _frame_cache[key] = [surf.convert_alpha() for surf in frames[st]]
+
+    def collect(self):
+        """Install every finished set; cheap to call once per frame."""
+        for path in [p for p, (_, _, future) in self.pending.items() if future.done()]:
+            self._install(path)
+
+    def wait(self, path):
+        """Block until path's set is installed; False if it was never requested."""
+        if path not in self.pending:
+            return False
+        self._install(path)
+        return True
+
+
+preloader = Preloader()
+
+
+# ---------- Projectiles ----------
+# name -> (animation folder, single-image fallback)
+PROJECTILES = {
+    'arrow':      (join('images', 'projectiles', 'arrow'), join('images', 'projectiles', 'arrow.png')),
+    'fire_arrow': (join('images', 'wizard', 'fire_arrow'), join('images', 'projectiles', 'fireball.png')),
+}
+
+# tuple of image paths -> ProjectileFrames
+_projectile_cache: dict[tuple[str, ...], 'ProjectileFrames'] = {}
+# name -> resolved image paths (so shots never list the folder again)
+_projectile_paths: dict[str, list[str]] = {}
+
+
+class ProjectileFrames:
+    """Decoded projectile frames, pre-rotated into a fixed number of angle buckets."""
+    def __init__(self, paths, buckets=PROJECTILE_ANGLE_BUCKETS):
+        raw_frames = [pygame.image.load(p).convert_alpha() for p in paths]
+        self.buckets = buckets
+        self.rotations = [
+            [pygame.transform.rotate(surf, i * 360 / buckets) for surf in raw_frames]
+            for i in range(buckets)
+        ]
+
+    def frames_for(self, direction):
+        """Frames rotated to the bucket nearest to the direction vector."""
+        angle = math.degrees(math.atan2(-direction.y, direction.x))
+        return self.rotations[round(angle * self.buckets / 360) % self.buckets]
+
+
+def projectile_paths(name):
+    """Resolve a projectile name to its frame files (animation folder first)."""
+    folder, fallback = PROJECTILES[name]
+    if os.path.isdir(folder):
+        return [join(folder, f) for f in sorted(os.listdir(folder)) if f.endswith('.png')]
+    return [fallback]
+
+
+def load_projectile(paths):
+    """Return the cached ProjectileFrames for a list of image paths."""
+    key = tuple(paths)
+    projectile = _projectile_cache.get(key)
+    if projectile is None:
+        projectile = _projectile_cache[key] = ProjectileFrames(key)
+    return projectile
+
+
+def get_projectile(name):
+    """Return the cached ProjectileFrames of a registered projectile."""
+    if name not in _projectile_paths:
+        _projectile_paths[name] = projectile_paths(name)
+    return load_projectile(_projectile_paths[name])
+
+
+def clear_cache():
+    for path in list(preloader.pending):
+        preloader.wait(path)
+    _frame_cache.clear()
+    _atlas_cache.clear()
+    _projectile_cache.clear()
+    _projectile_paths.clear()
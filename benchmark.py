@@ -0,0 +1,372 @@
+# benchmark.py
+"""
+Micro and macro benchmarks of the game's hot paths (headless).
+
+    python benchmark.py                          # run all, compare with the baseline
+    python benchmark.py --save-baseline          # run all, store as the new baseline
+    python benchmark.py --only draw arrow        # names containing 'draw' or 'arrow'
+    python benchmark.py --skip-macro             # leave out the 600 s simulated run
+
+Every benchmark is timed for a few rounds of `number` calls each (more calls
+if a round would take under ROUND_MS); the result is the per-call time in ms
+(min and median over the rounds). Results go to --out as JSON together with
+the machine they ran on. If a baseline exists, a benchmark whose min is more
+than --tolerance slower than the baseline's - plus the baseline's own spread
+between min and median - is measured again, up to RETRIES times; if it stays
+that slow it is a regression, and the exit status is 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from os.path import exists, dirname
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+import pygame
+
+from settings import SIM_FPS, ATLAS_DIR, HORDE_ENGINE, FLOW_FIELD
+
+BASELINE = 'benchmarks/baseline.json'
+RESULTS = 'benchmarks/latest.json'
+SEED = 1
+ROUND_MS = 50  # shortest timed round: shorter ones are mostly timer and scheduler noise
+RETRIES = 3    # re-measurements of a benchmark over the limit before it counts
+
+BENCHMARKS = {}  # name -> (setup(ctx) -> step, number, repeat, macro)
+
+
+def benchmark(name, number=1, repeat=10, macro=False):
+    """Register setup(ctx): it prepares the benchmark and returns the call to time."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, number, repeat, macro)
+        return setup
+    return register
+
+
+class Context:
+    """One headless game shared by the micro benchmarks (built once)."""
+    def __init__(self):
+        self.restore = None  # set by a setup that has to be undone afterwards
+        from main import Game
+        from controls import HunterControls
+
+        self.game = Game('bench', headless=True, seed=SEED, log_path=None,
+                         controls=HunterControls(SEED, 'knight'))
+        self.rng = self.game.rng
+
+    def spawn(self, count, radius=500):
+        """count regular enemies scattered around the player (previous ones released)."""
+        g = self.game
+        g.enemy_pool.clear(g.enemy_sprites)
+        px, py = g.player.rect.center
+        types = list(g.enemy_data.items())
+        for i in range(count):
+            etype, data = types[i % len(types)]
+            pos = (px + self.rng.uniform(-radius, radius), py + self.rng.uniform(-radius, radius))
+            g.enemy_pool.acquire(pos, etype, 1, data['hp'], data['dmg'], data['path'], data['exp'])
+        g.enemy_sprites.rebuild_index()
+        return g.enemy_sprites.sprites()
+
+    def new_enemy(self, groups=()):
+        from sprites import Enemy
+
+        g = self.game
+        data = g.enemy_data['orc']
+        return Enemy(g.player.rect.center, 'orc', 1, data['hp'], data['dmg'], data['path'],
+                     groups, g.collision_sprites, g.player, data['exp'], clock=g.clock)
+
+
+# ---------- sprite construction / image loading ----------
+@benchmark('enemy_init.cold')
+def enemy_init_cold(ctx):
+    from assets import clear_cache
+
+    def step():
+        clear_cache()  # decode the frames again (atlas or per-frame files)
+        ctx.new_enemy()
+    return step
+
+
+@benchmark('enemy_init.warm', number=2000)
+def enemy_init_warm(ctx):
+    ctx.new_enemy()
+    return ctx.new_enemy
+
+
+@benchmark('enemy.load_enemy_images.cold')
+def load_enemy_images_cold(ctx):
+    from assets import clear_cache
+
+    enemy = ctx.new_enemy()
+
+    def step():
+        clear_cache()
+        enemy.load_enemy_images()
+    return step
+
+
+@benchmark('player.load_player_images.cold')
+def load_player_images_cold(ctx):
+    from assets import clear_cache
+
+    player = ctx.game.player
+
+    def step():
+        clear_cache()
+        player.load_player_images('knight')
+    return step
+
+
+@benchmark('arrow_init', number=5000)
+def arrow_init(ctx):
+    from sprites import Arrow
+    from assets import get_projectile
+
+    g = ctx.game
+    projectile = get_projectile('arrow')
+    directions = [pygame.Vector2(1, 0).rotate(a) for a in range(0, 360, 7)]
+    state = {'i': 0}
+
+    def step():
+        state['i'] += 1
+        Arrow(projectile, g.player.rect.center, directions[state['i'] % len(directions)],
+              (), g.collision_sprites, clock=g.clock)
+    return step
+
+
+# ---------- drawing ----------
+def draw_setup(count):
+    def setup(ctx):
+        ctx.spawn(count)
+        g = ctx.game
+        return lambda: g.all_sprites.draw(g.player.hitbox_rect.center)
+    return setup
+
+
+for _count in (0, 100, 500, 2000):
+    benchmark(f'all_sprites.draw.{_count}', number=20)(draw_setup(_count))
+
+
+# ---------- collisions ----------
+@benchmark('player.collision', number=20000)
+def player_collision(ctx):
+    player = ctx.game.player
+    player.direction = pygame.Vector2(1, 1)
+
+    def step():
+        player.collision('horizontal')
+        player.collision('vertical')
+    return step
+
+
+@benchmark('enemy.collision', number=20000)
+def enemy_collision(ctx):
+    enemies = ctx.spawn(200)
+    state = {'i': 0}
+
+    def step():
+        state['i'] += 1
+        enemies[state['i'] % len(enemies)].collision()
+    return step
+
+
+def arrow_hits_setup(count, arrows=50):
+    """The arrow vs enemy pass of Game.step (resolve_arrow_hits, ex groupcollide)."""
+    def setup(ctx):
+        from sprites import Arrow
+        from assets import get_projectile
+
+        g = ctx.game
+        enemies = ctx.spawn(count)
+        for e in enemies:
+            e.max_hp = e.hp = 10 ** 9  # nothing dies mid-benchmark
+        projectile = get_projectile('arrow')
+        px, py = g.player.rect.center
+        volley = [Arrow(projectile, (px + ctx.rng.uniform(-500, 500), py + ctx.rng.uniform(-500, 500)),
+                        pygame.Vector2(1, 0), (), g.collision_sprites, clock=g.clock)
+                  for _ in range(arrows)]
+
+        def step():
+            g.arrow_sprites.add(volley)  # hits kill arrows: put the volley back
+            g.resolve_arrow_hits()
+        return step
+    return setup
+
+
+for _count in (100, 1000):
+    benchmark(f'arrow_hits.{_count}', number=50)(arrow_hits_setup(_count))
+
+
+# ---------- map ----------
+@benchmark('setup_map')
+def setup_map(ctx):
+    from groups import AllSprites, CollisionSprites
+
+    g = ctx.game
+    saved = (g.all_sprites, g.collision_sprites, g.player, g.spawn_positions, g.flow_field)
+
+    def step():
+        g.all_sprites, g.collision_sprites, g.spawn_positions = AllSprites(), CollisionSprites(), []
+        g.setup_map()
+
+    def restore():  # the other benchmarks keep using the original world
+        g.all_sprites, g.collision_sprites, g.player, g.spawn_positions, g.flow_field = saved
+    ctx.restore = restore
+    return step
+
+
+# ---------- whole game ----------
+@benchmark('simulated_run.600s', repeat=1, macro=True)
+def simulated_run(ctx):
+    from main import Game
+    from controls import HunterControls
+
+    def step():
+        game = Game('bench', headless=True, seed=SEED, log_path=None,
+                    controls=HunterControls(SEED, 'knight'), max_frames=600 * SIM_FPS)
+        game.player.health = game.player.max_health = 10 ** 9  # play all 600 s
+        game.run()
+    return step
+
+
+# ---------- running ----------
+def measure(step, number, repeat, warmup=True):
+    if warmup:
+        step()  # first-call caches, allocations
+        while True:  # like timeit's autorange: double number until a round is long enough
+            gc.collect()
+            started = time.perf_counter()
+            for _ in range(number):
+                step()
+            if (time.perf_counter() - started) * 1000 >= ROUND_MS:
+                break
+            number *= 2
+    times = []
+    for _ in range(repeat):
+        gc.collect()  # garbage of the last round (sprite <-> group cycles) is not billed here
+        started = time.perf_counter()
+        for _ in range(number):
+            step()
+        times.append((time.perf_counter() - started) / number * 1000)
+    return {'min_ms': min(times), 'median_ms': statistics.median(times),
+            'number': number, 'repeat': repeat}
+
+
+def machine():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except OSError:
+        commit = None
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'sdl': '.'.join(map(str, pygame.get_sdl_version())),
+        'numpy': numpy_version,
+        'atlases': exists(ATLAS_DIR),
+        'horde_engine': HORDE_ENGINE,
+        'flow_field': FLOW_FIELD,
+    }
+
+
+def run(names):
+    ctx = Context()
+    results = {}
+    for name in names:
+        setup, number, repeat, macro = BENCHMARKS[name]
+        ctx.restore = None
+        results[name] = measure(setup(ctx), number, repeat, warmup=not macro)  # a macro run is long enough
+        if ctx.restore:
+            ctx.restore()
+        print(f"{name:<34} {results[name]['median_ms']:10.3f} ms", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Per benchmark in both: (name, base ms, now ms, ratio, regressed)."""
+    rows = []
+    for name, now in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = now['min_ms'] / max(base['min_ms'], 1e-9)
+        # a benchmark that was noisy when the baseline was taken gets that much more room
+        spread = base['median_ms'] / max(base['min_ms'], 1e-9) - 1
+        rows.append((name, base['min_ms'], now['min_ms'], ratio, ratio > 1 + tolerance + spread))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--only', nargs='+', metavar='NAME', help='benchmarks whose name contains NAME')
+    parser.add_argument('--skip-macro', action='store_true', help='leave out the whole-game runs')
+    parser.add_argument('--out', default=RESULTS)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='also store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown of the min before it counts as a regression')
+    args = parser.parse_args(argv)
+
+    names = [n for n, (_s, _n, _r, macro) in BENCHMARKS.items()
+             if not (macro and args.skip_macro)
+             and (not args.only or any(part in n for part in args.only))]
+    report = {'machine': machine(), 'results': run(names)}
+    baseline = None
+    if not args.save_baseline and exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        for _ in range(RETRIES):
+            flagged = [row[0] for row in compare(report['results'], baseline, args.tolerance) if row[4]]
+            if not flagged:
+                break
+            print(f"\nmeasuring again: {', '.join(flagged)}", file=sys.stderr)
+            for name, again in run(flagged).items():  # keep the faster of the two
+                if again['min_ms'] < report['results'][name]['min_ms']:
+                    report['results'][name] = again
+
+    for path in [args.out] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+    if baseline is None:
+        return 0
+
+    base_machine = baseline.get('machine', {})
+    for key in ('processor', 'cpus', 'python', 'atlases', 'horde_engine', 'flow_field'):
+        if base_machine.get(key) != report['machine'][key]:
+            print(f"warning: baseline {key} was {base_machine.get(key)!r}, "
+                  f"now {report['machine'][key]!r}", file=sys.stderr)
+
+    rows = compare(report['results'], baseline, args.tolerance)
+    print(f"\n{'benchmark':<34} {'baseline':>10} {'now':>10} {'ratio':>7}", file=sys.stderr)
+    for name, base, now, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<34} {base:10.3f} {now:10.3f} {ratio:7.2f}{flag}", file=sys.stderr)
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.tolerance:.0%}: "
+              f"{', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
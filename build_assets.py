@@ -0,0 +1,104 @@
+# build_assets.py
+"""
+Pack each character's animation frames into one atlas sheet.
+
+    python build_assets.py            # rebuild atlases whose frames changed
+    python build_assets.py --force    # rebuild everything
+
+For every character folder (images/<job>, images/enemies/<type>) all
+<state>/N.png frames are packed into ATLAS_DIR/<name>.png, with a
+<name>.json manifest of the frame rects and the scale the game draws them
+at. assets.load_frames() then decodes one file per character, scales the
+whole sheet once and hands out subsurfaces; characters without an atlas
+still load frame by frame.
+
+The sheet is stored at source size: a pre-scaled sheet has scale**2 times
+the pixels and takes longer to decode than the scale call it saves.
+"""
+import argparse
+import json
+import os
+import sys
+from os.path import join, isdir
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+import pygame
+from settings import ATLAS_DIR
+from assets import frame_files, atlas_name, atlas_current, ATLAS_VERSION
+
+JOBS = ('soldier', 'knight', 'wizard', 'judiciar')
+ENEMIES_DIR = join('images', 'enemies')
+MAX_WIDTH = 4096  # frames wrap onto a new shelf past this width
+
+
+def character_folders():
+    folders = [join('images', job) for job in JOBS]
+    folders += [join(ENEMIES_DIR, d) for d in sorted(os.listdir(ENEMIES_DIR))
+                if isdir(join(ENEMIES_DIR, d))]
+    return [f for f in folders if isdir(f)]
+
+
+def pack(states):
+    """Shelf-pack the frames; returns (sheet, {state: [[x, y, w, h], ...]})."""
+    placed, rects = [], {}
+    x = y = shelf_h = width = 0
+    for state, paths in states.items():
+        rects[state] = []
+        for path in paths:
+            surf = pygame.image.load(path).convert_alpha()
+            w, h = surf.get_size()
+            if x and x + w > MAX_WIDTH:
+                x, y, shelf_h = 0, y + shelf_h, 0
+            placed.append((surf, (x, y)))
+            rects[state].append([x, y, w, h])
+            x += w
+            shelf_h = max(shelf_h, h)
+            width = max(width, x)
+
+    sheet = pygame.Surface((max(width, 1), max(y + shelf_h, 1)), pygame.SRCALPHA)
+    sheet.fill((0, 0, 0, 0))
+    for surf, pos in placed:
+        # MAX onto a cleared sheet copies the pixels, alpha included, unblended
+        sheet.blit(surf, pos, special_flags=pygame.BLEND_RGBA_MAX)
+    return sheet, rects
+
+
+def build(folder, scale=2, force=False):
+    """Build the atlas of one character; returns False if it was up to date."""
+    states = frame_files(folder)
+    name = atlas_name(folder)
+    manifest_path = join(ATLAS_DIR, name + '.json')
+    sources = [p for paths in states.values() for p in paths]
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            old = json.load(f)
+        if atlas_current(old, manifest_path, sources, scale):
+            return False
+
+    sheet, rects = pack(states)
+    os.makedirs(ATLAS_DIR, exist_ok=True)
+    pygame.image.save(sheet, join(ATLAS_DIR, name + '.png'))
+    manifest = {'version': ATLAS_VERSION, 'source': folder.replace(os.sep, '/'),
+                'scale': scale, 'image': name + '.png', 'frames': len(sources),
+                'states': rects}
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--force', action='store_true', help='rebuild even if up to date')
+    parser.add_argument('--scale', type=int, default=2,
+                        help='whole-number scale the frames are drawn at')
+    args = parser.parse_args(argv)
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))  # convert_alpha needs a display
+    for folder in character_folders():
+        status = 'built' if build(folder, args.scale, args.force) else 'up to date'
+        print(f"{folder:<36} {status}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+# charts.py
+"""
+The visualizer's charts, without any GUI: each one is a (data, plot) pair.
+The data function reads a RunAnalytics (summaries of runs.db, see
+analytics.py) and returns plain numbers; the plot function turns those into
+a matplotlib Figure. statistic_data.py shows them in Tk, report.py renders
+them to files.
+"""
+import pandas as pd
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+
+SCATTER_MAX_POINTS = 20000   # more (level, time) pairs than this -> wider time bins
+
+
+def counts_of(data, column):
+    return pd.Series(dict(data.counts(column)), name='count')
+
+
+def new_figure():
+    # Figure, not pyplot: no global figure list, works with any canvas/backend
+    fig = Figure()
+    return fig, fig.add_subplot()
+
+# Data functions (RunAnalytics -> chart data)
+def histogram_data(data):
+    return data.time_histogram(bins=10)
+
+def boxplot_play_time_data(data):
+    return data.time_box()
+
+def bar_class_data(data):
+    return counts_of(data, 'Class')
+
+def bar_miniboss_data(data):
+    return counts_of(data, 'Miniboss_Killed')
+
+def bar_beat_boss_data(data):
+    return counts_of(data, 'Beat_Final_Boss').rename({0: 'Lose', 1: 'Win'})
+
+def win_rate_by_class_data(data):
+    return pd.Series({job: rate * 100 for job, _runs, _wins, rate in data.win_rates()})
+
+def scatter_level_time_data(data):
+    # one point per (level, play time) that occurs; past SCATTER_MAX_POINTS
+    # the play times are merged into wider bins (doubling until it fits)
+    time_bin = 1
+    cells = data.level_time_cells()
+    while len(cells[0]) > SCATTER_MAX_POINTS:
+        time_bin *= 2
+        cells = data.level_time_cells(time_bin)
+    return cells, time_bin
+
+def box_time_by_class_data(data):
+    stats = [data.time_box(job) for job in sorted(data.categories['Class'])]
+    return [s for s in stats if s]
+
+# Plot functions (chart data -> Figure)
+def plot_histogram(hist):
+    fig, ax = new_figure()
+    counts, edges = hist
+    ax.hist(edges[:-1], bins=edges, weights=counts)
+    ax.set_title('Distribution of Play Time (sec)')
+    ax.set_xlabel('Play_Time_Sec')
+    return fig
+
+def plot_boxplot_play_time(stats):
+    fig, ax = new_figure()
+    ax.bxp([stats] if stats else [], vert=False)
+    ax.set_yticks([])
+    ax.set_title('Boxplot of Play Time (sec)')
+    ax.set_xlabel('Play_Time_Sec')
+    return fig
+
+def plot_bar_class(counts):
+    fig, ax = new_figure()
+    counts.plot.bar(ax=ax)
+    ax.set_title('Count by Class')
+    ax.set_ylabel('Number of Players')
+    return fig
+
+def plot_bar_miniboss(counts):
+    fig, ax = new_figure()
+    counts.plot.bar(ax=ax)
+    ax.set_title('Count by Miniboss Killed')
+    ax.set_ylabel('Number of Players')
+    return fig
+
+def plot_bar_beat_boss(counts):
+    fig, ax = new_figure()
+    counts.plot.bar(ax=ax)
+    ax.set_title('Beat Final Boss (Win vs Lose)')
+    ax.set_ylabel('Number of Players')
+    return fig
+
+def plot_win_rate_by_class(rates):
+    fig, ax = new_figure()
+    rates.plot.bar(ax=ax)
+    ax.set_title('Win Rate by Class')
+    ax.set_ylabel('Win %')
+    return fig
+
+def plot_scatter_level_time(scatter):
+    fig, ax = new_figure()
+    (levels, secs, runs), time_bin = scatter
+    if len(runs) and runs.max() > 1:
+        # many runs share a point: colour by how many
+        points = ax.scatter(levels, secs, c=runs, norm=LogNorm(), s=12)
+        fig.colorbar(points, ax=ax, label='Runs')
+    else:
+        ax.scatter(levels, secs)
+    ax.set_title('Level vs Play Time (sec)')
+    ax.set_xlabel('Level')
+    ax.set_ylabel('Play_Time_Sec' if time_bin == 1 else f'Play_Time_Sec ({time_bin} s bins)')
+    return fig
+
+def plot_box_time_by_class(stats):
+    fig, ax = new_figure()
+    ax.bxp(stats)
+    ax.grid(True)
+    ax.set_title('Play Time by Class')
+    ax.set_xlabel('Class')
+    ax.set_ylabel('Play_Time_Sec')
+    return fig
+
+
+CHARTS = {
+    "Histogram": (histogram_data, plot_histogram),
+    "Boxplot Play Time": (boxplot_play_time_data, plot_boxplot_play_time),
+    "Bar Class": (bar_class_data, plot_bar_class),
+    "Bar Miniboss": (bar_miniboss_data, plot_bar_miniboss),
+    "Bar Beat Boss": (bar_beat_boss_data, plot_bar_beat_boss),
+    "Win Rate by Class": (win_rate_by_class_data, plot_win_rate_by_class),
+    "Scatter Level vs Time": (scatter_level_time_data, plot_scatter_level_time),
+    "Box Time by Class": (box_time_by_class_data, plot_box_time_by_class),
+}
@@ -0,0 +1,167 @@
+# controls.py
+import random
+import pygame
+from settings import WINDOW_WIDTH, WINDOW_HEIGHT
+
+CLASS_CHOICES = ('knight', 'wizard', 'judiciar')
+MOVE_KEYS = (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d)
+SCREEN_CENTER = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+
+
+class KeyState:
+    """Stand-in for pygame.key.get_pressed(): keys[pygame.K_x] -> bool."""
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+class LiveControls:
+    """The real keyboard and mouse (default input source)."""
+    def update(self, game):
+        pass
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+    def get_mouse_pressed(self):
+        return pygame.mouse.get_pressed()
+
+    def get_mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+    def choose_class(self, game):
+        return game.show_class_menu(game.display_surface)
+
+    def finish(self, game):
+        """Called once when Game.run ends."""
+        pass
+
+
+class ScriptedControls(LiveControls):
+    """
+    Plays a fixed list of frames: (pressed keys, (lmb, mmb, rmb), mouse_pos).
+    After the script runs out the player stands still.
+    """
+    def __init__(self, frames, job=None):
+        self.frames = list(frames)
+        self.job = job
+        self.frame = -1
+        self.keys, self.buttons, self.mouse_pos = KeyState(), (False, False, False), SCREEN_CENTER
+
+    def update(self, game):
+        self.frame += 1
+        if self.frame < len(self.frames):
+            keys, self.buttons, self.mouse_pos = self.frames[self.frame]
+            self.keys = KeyState(keys)
+        else:
+            self.keys, self.buttons = KeyState(), (False, False, False)
+
+    def get_pressed(self):
+        return self.keys
+
+    def get_mouse_pressed(self):
+        return self.buttons
+
+    def get_mouse_pos(self):
+        return self.mouse_pos
+
+    def choose_class(self, game):
+        # None (or 'soldier') keeps the starting class
+        return self.job if self.job in CLASS_CHOICES else None
+
+
+def aim_at(game, world_pos):
+    """Screen position of world_pos, i.e. where the mouse must be to aim there."""
+    px, py = game.player.hitbox_rect.center
+    x = int(world_pos[0] - px + SCREEN_CENTER[0])
+    y = int(world_pos[1] - py + SCREEN_CENTER[1])
+    if (x, y) == SCREEN_CENTER:  # aiming needs a non-zero direction
+        x += 1
+    return x, y
+
+
+class RandomControls(ScriptedControls):
+    """Random-walk bot: holds a random direction for a while, clicks at random
+    and aims at the nearest enemy."""
+    def __init__(self, seed=None, job=None, hold_frames=(10, 60), click_chance=0.08, rng=None):
+        super().__init__((), job)
+        self.rng = rng or random.Random(seed)
+        self.hold_frames = hold_frames
+        self.click_chance = click_chance
+        self.hold = 0
+
+    def update(self, game):
+        rng = self.rng
+        if self.hold <= 0:
+            self.keys = KeyState(k for k in MOVE_KEYS if rng.random() < 0.3)
+            self.hold = rng.randint(*self.hold_frames)
+        self.hold -= 1
+
+        self.buttons = (rng.random() < self.click_chance, False,
+                        rng.random() < self.click_chance / 2)
+
+        target = game.player.hitbox_rect.center
+        nearest = None
+        for e in game.enemy_sprites:
+            d = (e.rect.centerx - target[0]) ** 2 + (e.rect.centery - target[1]) ** 2
+            if nearest is None or d < nearest[0]:
+                nearest = (d, e.rect.center)
+        if nearest:
+            self.mouse_pos = aim_at(game, nearest[1])
+        else:
+            self.mouse_pos = (rng.randrange(WINDOW_WIDTH), rng.randrange(WINDOW_HEIGHT))
+            if self.mouse_pos == SCREEN_CENTER:
+                self.mouse_pos = aim_at(game, target)
+
+
+class HunterControls(RandomControls):
+    """Bot that walks to the nearest enemy, swings when close and shoots/casts
+    (right click) when it is further away."""
+    def __init__(self, seed=None, job=None, melee_range=90, shoot_range=450, rng=None):
+        super().__init__(seed, job, rng=rng)
+        self.melee_range = melee_range
+        self.shoot_range = shoot_range
+
+    def update(self, game):
+        px, py = game.player.hitbox_rect.center
+        nearest = None
+        for e in game.enemy_sprites:
+            if e.is_dead:
+                continue
+            d = ((e.rect.centerx - px) ** 2 + (e.rect.centery - py) ** 2) ** 0.5
+            if nearest is None or d < nearest[0]:
+                nearest = (d, e.rect.center)
+
+        if nearest is None:  # nothing to hunt -> wander
+            super().update(game)
+            return
+
+        dist, (ex, ey) = nearest
+        keys = set()
+        if dist > self.melee_range * 0.7:
+            if ex > px + 8: keys.add(pygame.K_d)
+            if ex < px - 8: keys.add(pygame.K_a)
+            if ey > py + 8: keys.add(pygame.K_s)
+            if ey < py - 8: keys.add(pygame.K_w)
+        self.keys = KeyState(keys)
+        self.mouse_pos = aim_at(game, (ex, ey))
+        # buttons are edge-triggered in Player.input -> release every other frame
+        fire = self.rng.random() < 0.5
+        self.buttons = (fire and dist <= self.melee_range, False,
+                        fire and self.melee_range < dist <= self.shoot_range)
+
+
+class IdleControls(ScriptedControls):
+    """Bot that never touches the controls (baseline for balance runs)."""
+    def __init__(self, seed=None, job=None):
+        super().__init__((), job)
+
+
+# bot policy name -> factory(seed, job)
+POLICIES = {
+    'idle': IdleControls,
+    'random': RandomControls,
+    'hunter': HunterControls,
+}
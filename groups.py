@@ -1,12 +1,98 @@
 # groups.py
-from settings import WINDOW_WIDTH, WINDOW_HEIGHT
+from settings import WINDOW_WIDTH, WINDOW_HEIGHT, GROUND_CHUNK_SIZE, TILE_SIZE, ENEMY_GRID_CELL
+from spatial import SpatialGrid
+import heapq
 import pygame
 
+
+class GroundLayer:
+    """Static ground tiles baked once into fixed-size chunk surfaces."""
+    def __init__(self, tiles, chunk_size=GROUND_CHUNK_SIZE, background=(0, 0, 0)):
+        """
+        tiles is an iterable of (topleft, surface) pairs in world coordinates.
+        Each tile is blitted into every chunk it overlaps, so tiles larger than
+        the grid (or straddling a chunk border) are never clipped.
+        """
+        self.chunk_size = chunk_size
+        self.chunks = {}  # (cx, cy) -> Surface
+
+        for (x, y), surf in tiles:
+            w, h = surf.get_size()
+            for cy in range(y // chunk_size, (y + h - 1) // chunk_size + 1):
+                for cx in range(x // chunk_size, (x + w - 1) // chunk_size + 1):
+                    chunk = self.chunks.get((cx, cy))
+                    if chunk is None:
+                        # Opaque chunks blit much faster than per-pixel alpha;
+                        # the background matches the display clear colour.
+                        chunk = pygame.Surface((chunk_size, chunk_size)).convert()
+                        chunk.fill(background)
+                        self.chunks[(cx, cy)] = chunk
+                    chunk.blit(surf, (x - cx * chunk_size, y - cy * chunk_size))
+
+    def draw(self, surface, offset):
+        """Blit only the chunks that overlap the camera."""
+        size = self.chunk_size
+        ox, oy = round(offset.x), round(offset.y)
+        left, top = -ox, -oy
+        right, bottom = left + surface.get_width(), top + surface.get_height()
+
+        for cy in range(top // size, (bottom - 1) // size + 1):
+            for cx in range(left // size, (right - 1) // size + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk is not None:
+                    surface.blit(chunk, (cx * size + ox, cy * size + oy))
+
+
 class AllSprites(pygame.sprite.Group):
+    """
+    Camera group. Only sprites overlapping the camera are drawn, in depth
+    order (ground first, then by rect.centery, ties by the order they were
+    added). Static sprites (those with a .static attribute) sit in a grid
+    with fixed depth; moving sprites keep their order from the last frame,
+    which list.sort() fixes up in about linear time as they move.
+    """
     def __init__(self):
         super().__init__()
         self.display_surface = pygame.display.get_surface()
         self.offset = pygame.Vector2()
+        self.ground_layer = None  # GroundLayer, set by Game.setup_map
+
+        self.added = 0        # add counter, keeps ties in group order
+        self.order = {}       # sprite -> add counter
+        self.pending = {}     # still here, added since the last draw (may have no rect yet)
+        self.static_grid = None  # SpatialGrid of static sprites, built lazily
+        self.dynamic = []     # moving sprites, in last frame's depth order
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.order[sprite] = self.added
+        self.added += 1
+        self.pending[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.order.pop(sprite, None)
+        self.pending.pop(sprite, None)  # never drawn (e.g. headless): nothing to sync
+        if hasattr(sprite, 'static'):
+            self.static_grid = None  # rebuilt on the next draw
+        # moving sprites are dropped from self.dynamic on the next draw
+
+    def depth(self, sprite):
+        return (0 if hasattr(sprite, 'ground') else 1, sprite.rect.centery, self.order[sprite])
+
+    def _sync(self):
+        for sprite in self.pending:
+            if not hasattr(sprite, 'static'):
+                self.dynamic.append(sprite)
+            elif self.static_grid is not None:
+                self.static_grid.insert(sprite, sprite.rect.copy())
+        self.pending.clear()
+
+        if self.static_grid is None:
+            self.static_grid = SpatialGrid(GROUND_CHUNK_SIZE)
+            for sprite in self:
+                if hasattr(sprite, 'static'):
+                    self.static_grid.insert(sprite, sprite.rect.copy())
 
     def draw(self, target_pos):
         """
@@ -16,13 +102,130 @@ class AllSprites(pygame.sprite.Group):
         self.offset.x = -(target_pos[0] - WINDOW_WIDTH / 2)
         self.offset.y = -(target_pos[1] - WINDOW_HEIGHT / 2)
 
-        # You can separate objects into different layers, or just draw them.
-        # We'll do a small layering: ground vs objects.
-        ground_sprites = [sprite for sprite in self if hasattr(sprite, 'ground')]
-        object_sprites = [sprite for sprite in self if not hasattr(sprite, 'ground')]
+        # The baked ground never moves and needs no depth sorting.
+        if self.ground_layer:
+            self.ground_layer.draw(self.display_surface, self.offset)
+
+        self._sync()
+        camera = pygame.Rect(int(-self.offset.x) - 1, int(-self.offset.y) - 1,
+                             WINDOW_WIDTH + 2, WINDOW_HEIGHT + 2)
+        depth = self.depth
+
+        statics = sorted((depth(s) + (s,) for s in self.static_grid.query(camera)))
+
+        alive = self.spritedict
+        # dict.fromkeys: a sprite re-added before this draw is listed twice
+        dynamic = [s for s in dict.fromkeys(self.dynamic) if s in alive]
+        dynamic.sort(key=depth)  # nearly sorted already -> cheap
+        self.dynamic = dynamic
+        moving = [depth(s) + (s,) for s in dynamic
+                  if camera.colliderect(pygame.Rect(s.rect.topleft, s.image.get_size()))]
+
+        blit = self.display_surface.blit
+        for *_, sprite in heapq.merge(statics, moving):
+            blit(sprite.image, sprite.rect.topleft + self.offset)
+
+
+class CollisionSprites(pygame.sprite.Group):
+    """Static obstacles, bucketed in a tile-aligned grid once the map is loaded."""
+    def __init__(self):
+        super().__init__()
+        self.grid = None  # SpatialGrid, built by build_index()
+
+    def build_index(self):
+        self.grid = SpatialGrid(TILE_SIZE)
+        for sprite in self:
+            self.grid.insert(sprite, sprite.rect)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        if self.grid is not None:
+            self.grid.insert(sprite, sprite.rect)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.grid = None  # rebuilt on the next query
+
+    def query(self, rect):
+        """Obstacles whose rect overlaps rect, in the order they were added."""
+        if self.grid is None:
+            self.build_index()
+        return self.grid.query(rect)
+
+    def iter_overlapping(self, rect):
+        """
+        Yield obstacles overlapping rect in the order they were added.
+        The caller may move rect between yields (e.g. snapping a hitbox out
+        of an obstacle); the remaining obstacles are then looked up again
+        around the new position, exactly like a full linear scan would.
+        """
+        if self.grid is None:
+            self.build_index()
+        last = -1
+        while True:
+            before = tuple(rect)
+            for order, sprite in self.grid.query_entries(rect):
+                if order <= last:
+                    continue
+                last = order
+                yield sprite
+                if tuple(rect) != before:
+                    break
+            else:
+                return
+
+
+class EnemySprites(pygame.sprite.Group):
+    """Live enemies with a broad-phase grid, rebuilt once per frame after update."""
+    def __init__(self):
+        super().__init__()
+        self.grid = SpatialGrid(ENEMY_GRID_CELL)
+        self.unindexed = []  # added since the last rebuild
+        self.horde = None  # HordeEngine, set by Game when NumPy is available
+
+    def update(self, dt):
+        if self.horde is None:
+            super().update(dt)
+        else:
+            self.horde.update(self.sprites(), dt)
+
+    @staticmethod
+    def _bounds(sprite):
+        # Cover both rects: radius attacks test rect.center, the rest the hitbox.
+        return sprite.rect.union(sprite.hitbox_rect)
+
+    def rebuild_index(self):
+        self.grid.clear()
+        self.unindexed.clear()
+        for sprite in self:
+            self.grid.insert(sprite, self._bounds(sprite))
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        # Spawned between rebuilds; the sprite may not have a rect yet
+        # (Sprite.__init__ joins groups first), so index it on the next query.
+        self.unindexed.append(sprite)
+
+    def _index_new(self):
+        for sprite in self.unindexed:
+            if sprite in self.spritedict:
+                self.grid.insert(sprite, self._bounds(sprite))
+        self.unindexed.clear()
+
+    def query_rect(self, rect):
+        """Enemies whose hitbox overlaps rect."""
+        self._index_new()
+        alive = self.spritedict
+        # dict.fromkeys: a sprite re-added before the rebuild has two entries
+        return [e for e in dict.fromkeys(self.grid.candidates(rect))
+                if e in alive and e.hitbox_rect.colliderect(rect)]
 
-        for layer in [ground_sprites, object_sprites]:
-            # Sort them by rect.centery => "simple" layering
-            for sprite in sorted(layer, key=lambda s: s.rect.centery):
-                offset_pos = sprite.rect.topleft + self.offset
-                self.display_surface.blit(sprite.image, offset_pos)
+    def query_radius(self, center, radius):
+        """Enemies whose rect.center lies within radius of center."""
+        self._index_new()
+        center = pygame.Vector2(center)
+        r = int(radius) + 2
+        area = pygame.Rect(int(center.x) - r, int(center.y) - r, r * 2 + 1, r * 2 + 1)
+        alive = self.spritedict
+        return [e for e in dict.fromkeys(self.grid.candidates(area))
+                if e in alive and center.distance_to(e.rect.center) <= radius]
@@ -0,0 +1,202 @@
+# horde.py
+"""
+Vectorised movement for regular enemies (optional, needs NumPy).
+
+Enemy.update does, per sprite, a distance check against the player and then
+either attack_player() or move() (normalise, step, obstacle check). With
+hundreds of enemies that Python loop dominates the frame, so HordeEngine
+keeps the regular enemies in struct-of-arrays form - one slot per enemy,
+taken when EnemyPool lets it into the game and given back when it leaves -
+and does the distance / direction / step / obstacle part for all of them
+at once. The sprites only get their new center and facing back, and
+animate. Bosses keep the per-sprite path.
+
+The arithmetic follows the per-sprite code step by step (same doubles,
+pygame's rounding of float rect positions, colliderect's strict overlap
+test), so seeded runs and replays come out the same with or without it.
+"""
+try:
+    import numpy as np
+except ImportError:  # the engine is optional; EnemySprites falls back to Enemy.update
+    np = None
+
+HAVE_NUMPY = np is not None
+
+
+def _round_rect(v):
+    """Float -> int the way pygame.Rect does it (round half away from zero)."""
+    t = np.trunc(v)
+    return t + np.where(np.abs(v - t) >= 0.5, np.sign(v), 0.0)
+
+
+# slot state codes: walk_* (turns to face its heading), attack_*/hurt_*, death_*
+WALK, BUSY, DEAD = 0, 1, 2
+
+# slot arrays (grown by doubling): rect / hitbox centers, hitbox size, stats, state
+SLOT_FIELDS = {
+    'rx': np.float64, 'ry': np.float64, 'hx': np.float64, 'hy': np.float64,
+    'hw': np.int64, 'hh': np.int64, 'speed': np.float64, 'reach': np.float64,
+    'hp': np.float64, 'state': np.int8, 'facing': np.int8, 'used': bool,
+} if np is not None else {}
+
+
+class HordeEngine:
+    """
+    Positions, speeds, HP and states of the regular enemies, one array slot
+    per enemy. The engine moves them itself; a sprite only reports what it
+    changes on its own (damage taken, a new animation state) via mirror().
+    """
+    def __init__(self, collision_sprites, player, flow_field=None):
+        self.player = player
+        self.flow_field = flow_field
+        self._waypoints = None  # (field version, next-tile centre x, y, has next tile)
+        # obstacles never move; stored as edges for the overlap test
+        rects = [s.rect for s in collision_sprites]
+        self.ox0 = np.array([r.left for r in rects], dtype=np.int64)
+        self.oy0 = np.array([r.top for r in rects], dtype=np.int64)
+        self.ox1 = np.array([r.right for r in rects], dtype=np.int64)
+        self.oy1 = np.array([r.bottom for r in rects], dtype=np.int64)
+
+        self.size = 0   # slots handed out so far (in use or free)
+        self.free = []  # slots given back, reused first
+        for name, dtype in SLOT_FIELDS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self._grow()
+
+    @staticmethod
+    def handles(enemy):
+        # bosses warp / use specials that read their own rect mid-update
+        return not enemy.is_miniboss and enemy.hitbox_rect.w > 0 and enemy.hitbox_rect.h > 0
+
+    # ---------- slots ----------
+    def _grow(self):
+        capacity = max(2 * len(self.used), 64)
+        for name, dtype in SLOT_FIELDS.items():
+            grown = np.zeros(capacity, dtype=dtype)
+            old = getattr(self, name)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def attach(self, enemy):
+        """Give an enemy entering the game a slot (EnemyPool.acquire)."""
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == len(self.used):
+                self._grow()
+            slot = self.size
+            self.size += 1
+        enemy.horde, enemy.slot = self, slot
+        self.used[slot] = True
+        self.hw[slot], self.hh[slot] = enemy.hitbox_rect.size
+        self.speed[slot] = enemy.speed
+        self.reach[slot] = enemy.attack_range
+        self.mirror(enemy)
+
+    def detach(self, enemy):
+        """Free the slot of an enemy leaving the game (EnemyPool.release)."""
+        self.used[enemy.slot] = False
+        self.free.append(enemy.slot)
+        enemy.horde = enemy.slot = None
+
+    def mirror(self, enemy):
+        """Copy what the sprite changed itself (position, HP, state) into its slot."""
+        slot = enemy.slot
+        self.rx[slot], self.ry[slot] = enemy.rect.center
+        self.hx[slot], self.hy[slot] = enemy.hitbox_rect.center
+        self.hp[slot] = enemy.hp
+        self.state[slot] = (DEAD if enemy.is_dead else
+                            WALK if enemy.state.startswith('walk') else BUSY)
+        self.facing[slot] = -1 if 'left' in enemy.state else 1
+
+    # ---------- movement ----------
+    def _blocked(self, x0, y0, x1, y1):
+        """Per enemy: does the hitbox (x0, y0)-(x1, y1) overlap any obstacle?"""
+        if not len(self.ox0):
+            return np.zeros(len(x0), dtype=bool)
+        hit = ((x0[:, None] < self.ox1) & (x1[:, None] > self.ox0)
+               & (y0[:, None] < self.oy1) & (y1[:, None] > self.oy0))
+        return hit.any(axis=1)
+
+    def _targets(self, rcx, rcy, px, py):
+        """FlowField.waypoint for every enemy at once (rect centres rcx, rcy)."""
+        field = self.flow_field
+        if self._waypoints is None or self._waypoints[0] != field.version:
+            # next-tile centres as arrays, rebuilt only when the field is
+            step = np.array(field.next, dtype=np.int64)
+            size = field.tile_size
+            wx = (step % field.width) * size + size // 2
+            wy = (step // field.width) * size + size // 2
+            self._waypoints = (field.version, wx, wy, step >= 0)
+        _, wx, wy, has_step = self._waypoints
+
+        tx, ty = rcx // field.tile_size, rcy // field.tile_size
+        inside = (tx >= 0) & (tx < field.width) & (ty >= 0) & (ty < field.height)
+        tile = np.where(inside, ty * field.width + tx, 0).astype(np.int64)
+        use = inside & has_step[tile]
+        return np.where(use, wx[tile], px), np.where(use, wy[tile], py)
+
+    def plan(self, dt):
+        """
+        One vectorised pass over the live slots: enemies out of attack range
+        move (in the slot arrays) and walkers turn to their heading. Returns
+        per slot lists (attack, center x, center y, turn): turn is -1 / 1 when
+        the walk state flips to left / right, else 0.
+        """
+        n = self.size
+        slots = np.flatnonzero(self.used[:n] & (self.state[:n] != DEAD))
+        rcx, rcy = self.rx[slots], self.ry[slots]
+        px, py = self.player.rect.center
+
+        # distance / attack range (Vector2.length)
+        dx, dy = px - rcx, py - rcy
+        dist = np.sqrt(dx * dx + dy * dy)
+        attack = dist < self.reach[slots]
+
+        # heading: the flow field's next tile, or straight at the player
+        if self.flow_field is not None:
+            tx, ty = self._targets(rcx, rcy, px, py)
+            dx, dy = tx - rcx, ty - rcy
+            dist = np.sqrt(dx * dx + dy * dy)
+
+        # direction (Vector2.normalize, zero vector stays zero) and step
+        moving = dist > 0
+        safe = np.where(moving, dist, 1.0)
+        ux = np.where(moving, dx / safe, 0.0)
+        uy = np.where(moving, dy / safe, 0.0)
+        speed = self.speed[slots]
+        nx = _round_rect(self.hx[slots] + ux * speed * dt)
+        ny = _round_rect(self.hy[slots] + uy * speed * dt)
+
+        # obstacle check on the moved hitbox; blocked -> back to rect center
+        w, h = self.hw[slots], self.hh[slots]
+        x0 = nx.astype(np.int64) - w // 2
+        y0 = ny.astype(np.int64) - h // 2
+        blocked = self._blocked(x0, y0, x0 + w, y0 + h)
+        nx = np.where(blocked, rcx, nx)
+        ny = np.where(blocked, rcy, ny)
+
+        go = ~attack
+        moved = slots[go]
+        self.rx[moved] = self.hx[moved] = nx[go]
+        self.ry[moved] = self.hy[moved] = ny[go]
+        side = np.sign(ux).astype(np.int8)
+        turn = go & (self.state[slots] == WALK) & (side != 0) & (side != self.facing[slots])
+        self.facing[slots[turn]] = side[turn]
+
+        attacks = np.zeros(n, dtype=bool)
+        attacks[slots] = attack
+        turns = np.zeros(n, dtype=np.int8)
+        turns[slots[turn]] = side[turn]
+        return (attacks.tolist(), self.rx[:n].astype(np.int64).tolist(),
+                self.ry[:n].astype(np.int64).tolist(), turns.tolist())
+
+    def update(self, enemies, dt):
+        """Update every enemy in group order; the ones with a slot from a single plan()."""
+        attack, cx, cy, turn = self.plan(dt)
+        for enemy in enemies:
+            if enemy.horde is not self:
+                enemy.update(dt)
+            else:
+                slot = enemy.slot
+                enemy.follow(attack[slot], (cx[slot], cy[slot]), turn[slot], dt)
@@ -0,0 +1,44 @@
+# hud.py
+import pygame
+
+# size -> Font; SysFont is expensive to build, so every screen shares these.
+_fonts: dict[int, pygame.font.Font] = {}
+
+
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.SysFont(None, size)
+    return font
+
+
+class HUD:
+    """
+    Cached HUD widgets. Each widget keeps the surface it rendered last time
+    together with the value it was rendered for, and is only re-rendered
+    when that value changes - otherwise the cached surface is blitted.
+    """
+    def __init__(self):
+        self._widgets = {}  # name -> (key, Surface)
+
+    def widget(self, name, key, build):
+        cached = self._widgets.get(name)
+        if cached is None or cached[0] != key:
+            cached = self._widgets[name] = (key, build())
+        return cached[1]
+
+    def text(self, name, text, size, color):
+        return self.widget(name, (text, size, color),
+                           lambda: get_font(size).render(text, True, color))
+
+    def bar(self, name, size, fill_w, bg, fg):
+        """A size=(w, h) bar with its first fill_w pixels in fg."""
+        def build():
+            surf = pygame.Surface(size).convert()
+            surf.fill(bg)
+            surf.fill(fg, (0, 0, fill_w, size[1]))
+            return surf
+        return self.widget(name, (size, fill_w, bg, fg), build)
+
+    def clear(self):
+        self._widgets.clear()
@@ -0,0 +1,155 @@
+# leaderboard.py
+"""
+Top-K boards over the run log, kept up to date as runs are logged.
+
+Every board is a bounded min-heap of its K best runs, so a new run costs
+O(log K) and opening the leaderboard only sorts K entries, however many runs
+runs.db holds. The heaps are saved next to the database
+(runs.db -> runs.leaderboard.json) with the id and contents of the last run
+taken in; runs that reached the database another way (CSV import,
+simulate.py --db) are caught up from that id, on the next write or by
+update(). A database that was rebuilt (new identity, or that run changed)
+starts the boards over.
+"""
+import heapq
+import json
+import os
+import threading
+from os.path import exists, splitext
+
+from settings import LEADERBOARD_K
+
+VERSION = 3
+# a run on a board: [id, Player, Play_Time_Sec, Class, Level, Miniboss_Killed, Beat_Final_Boss]
+ID, PLAYER, SECS, CLASS, LEVEL, MINIBOSS, WON = range(7)
+
+
+def fastest_win(run):
+    """Victories first, the fastest on top; defeats after, the longest survival on top."""
+    return (run[WON], -run[SECS] if run[WON] else run[SECS], run[LEVEL], -run[ID])
+
+
+def highest_level(run):
+    return (run[LEVEL], run[WON], -run[SECS], -run[ID])
+
+
+BOARDS = {  # board -> (title, ranking key: bigger is better)
+    'fastest': ("Fastest Victories", fastest_win),
+    'level': ("Highest Level", highest_level),
+}
+
+
+def class_board(job):
+    return 'class:' + job
+
+
+def board_spec(name):
+    if name.startswith('class:'):
+        return name[6:].capitalize(), fastest_win
+    return BOARDS[name]
+
+
+class Leaderboard:
+    def __init__(self, store, path=None, k=LEADERBOARD_K):
+        self.store = store
+        self.path = path or splitext(store.path)[0] + '.leaderboard.json'
+        self.k = k
+        self.lock = threading.Lock()  # runs can arrive on the store's writer thread
+        self.identity = None  # RunStore.identity() of the database ranked here
+        self._clear()
+        self._load()
+
+    def _clear(self):
+        self.heaps = {}
+        self.runs = 0
+        self.last_id = 0  # runs.db id of the newest run taken in
+        self.last_run = None  # that run, to tell a rebuilt database apart
+
+    # ---------- persistence ----------
+    def _load(self):
+        if not exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('version') != VERSION or saved.get('k') != self.k:
+            return  # rebuilt by the next update()
+        self.identity, self.runs = saved['identity'], saved['runs']
+        self.last_id, self.last_run = saved['last_id'], saved['last_run']
+        for name, runs in saved['boards'].items():
+            key = board_spec(name)[1]
+            self.heaps[name] = [(key(run), run) for run in runs]
+            heapq.heapify(self.heaps[name])
+
+    def _save(self):
+        saved = {'version': VERSION, 'k': self.k, 'identity': self.identity, 'runs': self.runs,
+                 'last_id': self.last_id, 'last_run': self.last_run,
+                 'boards': {name: [run for _key, run in heap] for name, heap in self.heaps.items()}}
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(saved, f)
+        os.replace(tmp, self.path)
+
+    # ---------- updates ----------
+    def _push(self, run):
+        for name in ('fastest', 'level', class_board(run[CLASS])):
+            key = board_spec(name)[1]
+            entry = (key(run), run)
+            heap = self.heaps.setdefault(name, [])
+            if len(heap) < self.k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:  # better than the worst kept run
+                heapq.heapreplace(heap, entry)
+        self.runs += 1
+        self.last_id = run[ID]
+        self.last_run = run
+
+    def _catch_up(self, upto=None):
+        """
+        (lock held) Take in the runs written after last_id, up to id upto.
+        Reads only what is already written - never waits on the store's writer.
+        """
+        store = self.store
+        identity = store.identity()
+        if self.last_id and (identity != self.identity
+                             or store.get(self.last_id, wait=False) != tuple(self.last_run[1:])):
+            self._clear()  # another or a rebuilt database: rank it from the start
+        self.identity = identity
+        added = 0
+        for rows in store.fetch_since(self.last_id, upto=upto, wait=False):
+            for row in rows:
+                self._push(list(row))
+            added += len(rows)
+        return added
+
+    def on_write(self, first_id, rows):
+        """RunStore listener: take in a batch just written (writer thread)."""
+        with self.lock:
+            self._catch_up(upto=first_id - 1)  # usually nothing: no gap before the batch
+            for offset, row in enumerate(rows):
+                if first_id + offset > self.last_id:  # update() may have read it already
+                    self._push([first_id + offset, *row])
+            self._save()
+
+    def update(self):
+        """Take in every run logged since the last one seen; returns how many."""
+        self.store.sync()  # not under the lock: on_write may need it to finish the batch
+        with self.lock:
+            before = (self.identity, self.last_id)
+            added = self._catch_up()
+            if (self.identity, self.last_id) != before or not exists(self.path):
+                self._save()
+        return added
+
+    # ---------- reads ----------
+    def names(self):
+        """Boards in display order: the overall ones, then one per class."""
+        classes = sorted(n for n in self.heaps if n.startswith('class:'))
+        return [n for n in BOARDS if n in self.heaps] + classes
+
+    def title(self, name):
+        return board_spec(name)[0]
+
+    def board(self, name):
+        """Runs of one board, best first (at most K)."""
+        with self.lock:
+            return [run for _key, run in sorted(self.heaps.get(name, ()), reverse=True)]
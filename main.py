@@ -1,33 +1,82 @@
 import pygame
 import sys
 from os.path import join
-from random import choice
-from pytmx.util_pygame import load_pygame
 import random
 from settings import (
-    WINDOW_WIDTH, WINDOW_HEIGHT, TILE_SIZE,ARROW_BASE_DMG,ARROW_DMG_PER_LEVEL,
+    WINDOW_WIDTH, WINDOW_HEIGHT, ARROW_BASE_DMG,ARROW_DMG_PER_LEVEL,
     MINIBOSS_DMG, MINIBOSS_HP, MINIBOSS_EXP, MINIBOSS_NAME, MINIBOSS_IMG_PATH, MINIBOSS_TRIGGER_LEVEL
     ,GAME_TIME_LIMIT, WEREWOLF_HP, WEREWOLF_DMG, WEREWOLF_EXP, WEREWOLF_NAME, WEREWOLF_IMG_PATH, WEREWOLF_TRIGGER_LV,
-    WEREWOLF_SPECIAL_CD, ELITE_HP, ELITE_DMG, ELITE_EXP, ELITE_NAME, ELITE_IMG_PATH, ELITE_TRIGGER_LV, ELITE_SPECIAL_CD)
-from groups import AllSprites
-from player import Player
-from sprites import Enemy, Sprite, CollisionSprite
-import csv, os
+    WEREWOLF_SPECIAL_CD, ELITE_HP, ELITE_DMG, ELITE_EXP, ELITE_NAME, ELITE_IMG_PATH, ELITE_TRIGGER_LV, ELITE_SPECIAL_CD,
+    PRELOAD_ENEMY_FRAMES, ENEMY_SPAWN_MS, SIM_FPS, PROFILER_KEY,
+    CLASS_CHOICE_LEVEL, PREFETCH_LEVELS_AHEAD, PREFETCH_SECONDS_AHEAD, ENEMY_POOL_PREWARM,
+    HORDE_ENGINE, FLOW_FIELD, RUNS_DB, RUNS_CSV, LEADERBOARD_PAGE_SIZE)
+from mapcache import load_map
+from groups import AllSprites, GroundLayer, CollisionSprites, EnemySprites
+from player import Player, PLAYER_STATES
+from sprites import Enemy, CollisionSprite, ENEMY_STATES
+from pool import EnemyPool
+from pathfinding import FlowField
+from horde import HordeEngine, HAVE_NUMPY
+from assets import warm_up, get_projectile, preloader
+from timing import RealClock, FixedStepClock
+from controls import LiveControls, CLASS_CHOICES
+from replay import Replay, RecordingControls, ReplayControls
+from profiler import FrameProfiler
+from hud import HUD, get_font
+from ui import UILoop, Button
+from runstore import RunStore
+from leaderboard import Leaderboard, PLAYER, SECS, CLASS, LEVEL, WON
+import os
+import argparse, time
 from datetime import datetime
 
-CSV_PATH = "runs.csv"
 
+def legacy_log(log_path):
+    """The old CSV log to take into log_path: only the game's own RUNS_DB gets runs.csv."""
+    return RUNS_CSV if log_path == RUNS_DB else None
 
 
 class Game:
-    def __init__(self, player_name):
+    def __init__(self, player_name, headless=False, controls=None,
+                 log_path=RUNS_DB, max_frames=None, seed=None, clock=None,
+                 profile_path=None):
+        """
+        headless=True runs the same update logic without a window, at a fixed
+        step of 1/SIM_FPS s and as fast as the CPU allows. Input then comes from
+        controls (e.g. controls.RandomControls), which are required: the live
+        keyboard would wait forever on the class menu. run() returns the
+        logged row.
+
+        All randomness goes through self.rng (seeded with seed) and all game
+        time through clock, so a seeded run on a FixedStepClock with the same
+        inputs is exactly reproducible.
+        """
+        if headless and controls is None:
+            raise ValueError("a headless Game needs controls (e.g. controls.HunterControls)")
+        self.headless = headless
+        if headless:
+            # no window: SDL's dummy driver still gives convert()/convert_alpha()
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+            os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
         pygame.init()
         self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption("The Last Crusade")
-        self.clock = pygame.time.Clock()
+        self.clock = clock or (FixedStepClock(SIM_FPS) if headless else RealClock())
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.controls = controls or LiveControls()
+        self.log_path = log_path
+        self.run_store = RunStore(log_path, legacy_csv=legacy_log(log_path)) if log_path else None
+        if self.run_store is not None:
+            # top-K boards follow every batch the store writes
+            self.run_store.listeners.append(Leaderboard(self.run_store).on_write)
+        self.max_frames = max_frames
+        self.profiler = FrameProfiler(dump_path=profile_path)  # F3 = overlay
+        self.hud = HUD()
+        self.frame = 0
+        self.result = None
         self.running = True
         self.player_name = player_name
-        self.start_time = pygame.time.get_ticks()
 
         self.miniboss_spawned = False
         self.miniboss = None
@@ -40,18 +89,18 @@ class Game:
 
         self.class_chosen = False
         self.showing_class_menu = False
+        self.prefetched = set()  # sprite sets handed to the background preloader
 
-        self.start_time = pygame.time.get_ticks()
+        self.start_time = self.clock.get_ticks()
 
         # sprite groups
         self.all_sprites = AllSprites()
-        self.collision_sprites = pygame.sprite.Group()
-        self.enemy_sprites = pygame.sprite.Group()
+        self.collision_sprites = CollisionSprites()
+        self.enemy_sprites = EnemySprites()
         self.arrow_sprites = pygame.sprite.Group()
 
-        # spawn event
-        self.enemy_event = pygame.event.custom_type()
-        pygame.time.set_timer(self.enemy_event, 2000)  # spawn every 2 seconds
+        # spawn timer (game clock, so it also works faster than real time)
+        self.next_spawn_time = self.start_time + ENEMY_SPAWN_MS  # spawn every 2 seconds
         self.spawn_positions = []
 
         # enemy data (three example types)
@@ -60,43 +109,106 @@ class Game:
             'skeleton': {'hp': 90, 'dmg': 10, 'exp': 40, 'path': 'images/enemies/skeleton'},
             'orc': {'hp': 150, 'dmg': 15, 'exp': 75, 'path': 'images/enemies/orc'},
         }
+        if PRELOAD_ENEMY_FRAMES:
+            self.preload_enemy_frames()
+        # decode + pre-rotate projectiles so the first shot does no I/O
+        get_projectile('arrow')
+        get_projectile('fire_arrow')
 
         self.setup_map()
 
+        # regular enemies move in one NumPy pass per frame (optional)
+        if HORDE_ENGINE and HAVE_NUMPY:
+            self.enemy_sprites.horde = HordeEngine(self.collision_sprites, self.player,
+                                                   self.flow_field)
+        # regular enemies are recycled, not rebuilt every spawn
+        self.enemy_pool = EnemyPool((self.all_sprites, self.enemy_sprites),
+                                    self.collision_sprites, self.player, self.clock,
+                                    flow_field=self.flow_field, horde=self.enemy_sprites.horde)
+        for etype, data in self.enemy_data.items():
+            self.enemy_pool.prewarm(etype, ENEMY_POOL_PREWARM, data['hp'], data['dmg'],
+                                    data['path'], data['exp'])
+
+    def preload_enemy_frames(self):
+        """Decode every enemy and boss animation once, before the first spawn."""
+        paths = [data['path'] for data in self.enemy_data.values()]
+        paths += [MINIBOSS_IMG_PATH, WEREWOLF_IMG_PATH, ELITE_IMG_PATH]
+        warm_up(paths, ENEMY_STATES)
+
     def setup_map(self):
         """
         Load Tiled map from data/maps/world.tmx (edit as needed).
         """
-        tmx_map = load_pygame(join('data','maps','world.tmx'))
+        # parsed once, then read back from the compiled cache (see mapcache.py)
+        world = load_map(join('data','maps','world.tmx'))
 
-        # ground layer
-        for x,y,image in tmx_map.get_layer_by_name('Ground').tiles():
-            Sprite((x*TILE_SIZE,y*TILE_SIZE), image, self.all_sprites)
+        # ground layer (baked into chunks, not one sprite per tile)
+        self.all_sprites.ground_layer = GroundLayer(world.ground_tiles())
 
         # object & collisions
-        for obj in tmx_map.get_layer_by_name('Objects'):
-            CollisionSprite((obj.x,obj.y), obj.image, (self.all_sprites, self.collision_sprites))
+        for x, y, gid in world.objects:
+            CollisionSprite((x,y), world.images[gid], (self.all_sprites, self.collision_sprites))
 
-        for obj in tmx_map.get_layer_by_name('Collisions'):
-            surf = pygame.Surface((obj.width, obj.height))
-            CollisionSprite((obj.x,obj.y), surf, self.collision_sprites)
+        for x, y, w, h in world.collisions:
+            surf = pygame.Surface((w, h))
+            CollisionSprite((x,y), surf, self.collision_sprites)
+
+        # obstacles never move -> index them once for collision queries
+        self.collision_sprites.build_index()
+        # one shared path towards the player over the tile grid (see pathfinding.py)
+        self.flow_field = None
+        if FLOW_FIELD:
+            self.flow_field = FlowField.from_obstacles(
+                world.width, world.height, [s.rect for s in self.collision_sprites])
 
         # player & spawns
-        for obj in tmx_map.get_layer_by_name('Entities'):
-            if obj.name == 'Player':
+        for name, x, y in world.entities:
+            if name == 'Player':
                 self.player = Player(
-                    (obj.x,obj.y),
+                    (x,y),
                     self.all_sprites,
                     self.collision_sprites,
                     self.arrow_sprites,
-                    self.enemy_sprites
+                    self.enemy_sprites,
+                    clock=self.clock,
+                    controls=self.controls
                 )
             else:
-                self.spawn_positions.append((obj.x,obj.y))
+                self.spawn_positions.append((x,y))
 
-    @staticmethod
-    def collide_hitbox(sprite_a, sprite_b):
-        return sprite_a.hitbox_rect.colliderect(sprite_b.hitbox_rect)
+    def prefetch_assets(self, elapsed_sec):
+        """
+        Decode the class sprite sets and boss sets on a worker thread a few
+        levels before they are needed, so the class change / boss spawn
+        does not stall on disk.
+        """
+        preloader.collect()
+        level = self.player.level + PREFETCH_LEVELS_AHEAD
+        wanted = []
+        if not self.class_chosen and level >= CLASS_CHOICE_LEVEL:
+            wanted += [(join('images', job), PLAYER_STATES) for job in CLASS_CHOICES]
+        if level >= MINIBOSS_TRIGGER_LEVEL:
+            wanted.append((MINIBOSS_IMG_PATH, ENEMY_STATES))
+        if level >= WEREWOLF_TRIGGER_LV:
+            wanted.append((WEREWOLF_IMG_PATH, ENEMY_STATES))
+        if level >= ELITE_TRIGGER_LV or elapsed_sec >= GAME_TIME_LIMIT - PREFETCH_SECONDS_AHEAD:
+            wanted.append((ELITE_IMG_PATH, ENEMY_STATES))
+        for path, states in wanted:
+            if path not in self.prefetched:
+                self.prefetched.add(path)
+                preloader.request(path, states)
+
+    def resolve_arrow_hits(self):
+        """Arrow vs enemy hits - each arrow only looks at enemies near its hitbox."""
+        base = ARROW_BASE_DMG + (self.player.level - 1) * ARROW_DMG_PER_LEVEL
+        for arrow in self.arrow_sprites.sprites():
+            enemies = self.enemy_sprites.query_rect(arrow.hitbox_rect)
+            if not enemies:
+                continue
+            dmg_each = arrow.damage if getattr(arrow, "damage", 0) else base
+            for e in enemies:
+                e.take_damage(dmg_each)
+            arrow.kill()
 
     def spawn_enemy(self):
         """สุ่มสร้างศัตรูธรรมดา ถ้าไม่มีบอสมีชีวิตอยู่"""
@@ -108,15 +220,15 @@ class Game:
         if not self.spawn_positions:
             return
 
-        pos   = random.choice(self.spawn_positions)
-        etype = random.choice(list(self.enemy_data.keys()))
+        pos   = self.rng.choice(self.spawn_positions)
+        etype = self.rng.choice(list(self.enemy_data.keys()))
         data  = self.enemy_data[etype]
 
         # เลเวลใกล้ผู้เล่น (±1) อย่างน้อย 1
         player_lvl = self.player.level
-        level = random.randint(max(1, player_lvl - 1), player_lvl + 1)
+        level = self.rng.randint(max(1, player_lvl - 1), player_lvl + 1)
 
-        Enemy(
+        self.enemy_pool.acquire(
             pos      = pos,
             enemy_type = etype,
             level    = level,
@@ -124,23 +236,19 @@ class Game:
             base_hp  = data['hp'],
             base_dmg = data['dmg'],
             path     = data['path'],
-            groups   = (self.all_sprites, self.enemy_sprites),
-            collision_sprites = self.collision_sprites,
-            player   = self.player
         )
 
     def spawn_miniboss(self):
         """สปอว์นมินิบอสครั้งเดียว แล้วลบศัตรูอื่นออก"""
         self.miniboss_spawned = True
 
-        # ลบศัตรูปกติทั้งหมด
-        for e in list(self.enemy_sprites):
-            e.kill()
+        # ลบศัตรูปกติทั้งหมด (กลับเข้า pool)
+        self.enemy_pool.clear(self.enemy_sprites)
 
         # ตำแหน่งเกิด – หา spawn point ที่ใกล้ผู้เล่น (< 500px) ไม่ก็กลางจอ
         near = [p for p in self.spawn_positions
                 if pygame.Vector2(p).distance_to(self.player.rect.center) < 500]
-        pos = choice(near) if near else (self.player.rect.centerx + 150, self.player.rect.centery)
+        pos = self.rng.choice(near) if near else (self.player.rect.centerx + 150, self.player.rect.centery)
 
         # สร้างมินิบอส
         self.miniboss = Enemy(
@@ -151,16 +259,17 @@ class Game:
             collision_sprites=self.collision_sprites,
             player=self.player,
             exp_reward=MINIBOSS_EXP,
-            is_miniboss=True
+            is_miniboss=True,
+            clock=self.clock,
+            flow_field=self.flow_field
         )
 
     def spawn_boss(self, name, hp, dmg, exp, path,
                    special_cd=0, dmg_special=0,  # ★ ค่าปริยาย
                    is_miniboss=False, is_elite=False):
 
-        # เคลียร์ศัตรูธรรมดาทั้งหมด
-        for e in list(self.enemy_sprites):
-            e.kill()
+        # เคลียร์ศัตรูธรรมดาทั้งหมด (กลับเข้า pool)
+        self.enemy_pool.clear(self.enemy_sprites)
 
         boss = Enemy(
             self.player.rect.center + pygame.Vector2(250, 0),
@@ -168,7 +277,8 @@ class Game:
             hp, dmg, path,
             (self.all_sprites, self.enemy_sprites),
             self.collision_sprites, self.player,
-            exp, is_miniboss or is_elite
+            exp, is_miniboss or is_elite,
+            clock=self.clock, flow_field=self.flow_field
         )
         # ---------- กำหนดสกิล ----------
         boss.special_cd = special_cd
@@ -177,101 +287,150 @@ class Game:
         return boss
 
     def run(self):
+        """Main loop. Headless runs return the logged row (None if cut short)."""
         while self.running:
             dt = self.clock.tick(60) / 1000
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == self.enemy_event:
-                    self.spawn_enemy()
-
-            self.all_sprites.update(dt)
-
-            elapsed_sec = (pygame.time.get_ticks() - self.start_time) // 1000
-            elapsed_sec = (pygame.time.get_ticks() - self.start_time) // 1000
-            lv_cond = self.player.level >= ELITE_TRIGGER_LV  # เลเวล 30 ขึ้นไป
-            time_cond = elapsed_sec >= GAME_TIME_LIMIT  # หรือครบ 10 นาที
-
-            # --- Mini-boss #1 (เดิม) ---
-            if not self.miniboss_spawned and not self.miniboss_defeated \
-                    and self.player.level >= MINIBOSS_TRIGGER_LEVEL:
-                self.miniboss = self.spawn_boss(MINIBOSS_NAME, MINIBOSS_HP,
-                                                MINIBOSS_DMG, MINIBOSS_EXP,
-                                                MINIBOSS_IMG_PATH, is_miniboss=True)
-                self.miniboss_spawned = True
-
-            if not self.miniboss2_spawned and self.player.level >= WEREWOLF_TRIGGER_LV:
-                self.miniboss2 = self.spawn_boss(
-                    WEREWOLF_NAME, WEREWOLF_HP, WEREWOLF_DMG, WEREWOLF_EXP,
-                    WEREWOLF_IMG_PATH, WEREWOLF_SPECIAL_CD, WEREWOLF_DMG * 2,
-                    is_miniboss=True)
-                self.miniboss2_spawned = True
-
-            # Elite Orc  (LV30 หรือ 10 นาที)
-            if not self.elite_spawned and (lv_cond or time_cond):
-                self.elite = self.spawn_boss(
-                    ELITE_NAME, ELITE_HP, ELITE_DMG, ELITE_EXP,
-                    ELITE_IMG_PATH, ELITE_SPECIAL_CD, ELITE_DMG * 2.5,
-                    is_elite=True)
-                self.elite_spawned = True
-
-            if self.miniboss and self.miniboss.is_dead and self.miniboss_spawned:
-                self.miniboss_spawned = False
-                self.miniboss_defeated = True
-                self.miniboss = None
-
-            # ถ้า player ถึง LV 10 แล้วยังไม่ได้เรียกมินิบอส → สปอว์น
-            if (
-                    not self.miniboss_spawned
-                    and not self.miniboss_defeated
-                    and self.player.level >= MINIBOSS_TRIGGER_LEVEL
-            ):
-                self.spawn_miniboss()
-
-            # arrow vs enemy collisions
-            base = ARROW_BASE_DMG + (self.player.level - 1) * ARROW_DMG_PER_LEVEL
-            for arrow, enemies in pygame.sprite.groupcollide(
-                    self.arrow_sprites,
-                    self.enemy_sprites,
-                    False, False,
-                    self.collide_hitbox
-            ).items():
-                dmg_each = arrow.damage if getattr(arrow, "damage", 0) else base
-                for e in enemies:
-                    e.take_damage(dmg_each)
-                arrow.kill()
-
-            if not self.class_chosen and self.player.level >= 15 and not self.showing_class_menu:
-                self.showing_class_menu = True
-                choice = self.show_class_menu(self.display_surface)
+            self.profiler.begin_frame()
+            if not self.headless:
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.running = False
+                    elif event.type == pygame.KEYDOWN and event.key == PROFILER_KEY:
+                        self.profiler.toggle()
+
+            self.step(dt)
+            if not self.headless:
+                self.draw()
+            self.profiler.end_frame()
+
+            self.frame += 1
+            if self.max_frames is not None and self.frame >= self.max_frames:
+                self.running = False
+
+        self.controls.finish(self)
+        self.profiler.close()
+        if self.run_store is not None:
+            self.run_store.close()  # waits for the last batch
+        if self.headless:
+            return self.result
+        pygame.quit()
+        sys.exit()
+
+    def step(self, dt):
+        """One frame of game logic (everything except drawing)."""
+        self.controls.update(self)
+        if not self.running:  # e.g. a replay ran out of frames
+            return
+
+        now = self.clock.get_ticks()
+        if now >= self.next_spawn_time:
+            self.spawn_enemy()
+            # like pygame.time.set_timer: missed periods are not queued up
+            self.next_spawn_time += ENEMY_SPAWN_MS * ((now - self.next_spawn_time) // ENEMY_SPAWN_MS + 1)
+
+        profiler = self.profiler
+        profiler.lap('events')
+
+        # Same order as all_sprites.update(dt) (player, then enemies/arrows,
+        # arrows fired this frame wait a frame), but timed per subsystem.
+        arrows = self.arrow_sprites.sprites()
+        self.player.update(dt)
+        profiler.lap('update.player')
+        if self.flow_field is not None:
+            self.flow_field.retarget(self.player.rect.center)  # BFS only on a new tile
+        self.enemy_sprites.update(dt)
+        self.enemy_sprites.rebuild_index()  # broad-phase for hits next
+        profiler.lap('update.enemies')
+        for arrow in arrows:
+            arrow.update(dt)
+        profiler.lap('update.arrows')
+
+        elapsed_sec = (self.clock.get_ticks() - self.start_time) // 1000
+        lv_cond = self.player.level >= ELITE_TRIGGER_LV  # เลเวล 30 ขึ้นไป
+        time_cond = elapsed_sec >= GAME_TIME_LIMIT  # หรือครบ 10 นาที
+
+        # --- Mini-boss #1 (เดิม) ---
+        if not self.miniboss_spawned and not self.miniboss_defeated \
+                and self.player.level >= MINIBOSS_TRIGGER_LEVEL:
+            self.miniboss = self.spawn_boss(MINIBOSS_NAME, MINIBOSS_HP,
+                                            MINIBOSS_DMG, MINIBOSS_EXP,
+                                            MINIBOSS_IMG_PATH, is_miniboss=True)
+            self.miniboss_spawned = True
+
+        if not self.miniboss2_spawned and self.player.level >= WEREWOLF_TRIGGER_LV:
+            self.miniboss2 = self.spawn_boss(
+                WEREWOLF_NAME, WEREWOLF_HP, WEREWOLF_DMG, WEREWOLF_EXP,
+                WEREWOLF_IMG_PATH, WEREWOLF_SPECIAL_CD, WEREWOLF_DMG * 2,
+                is_miniboss=True)
+            self.miniboss2_spawned = True
+
+        # Elite Orc  (LV30 หรือ 10 นาที)
+        if not self.elite_spawned and (lv_cond or time_cond):
+            self.elite = self.spawn_boss(
+                ELITE_NAME, ELITE_HP, ELITE_DMG, ELITE_EXP,
+                ELITE_IMG_PATH, ELITE_SPECIAL_CD, ELITE_DMG * 2.5,
+                is_elite=True)
+            self.elite_spawned = True
+
+        if self.miniboss and self.miniboss.is_dead and self.miniboss_spawned:
+            self.miniboss_spawned = False
+            self.miniboss_defeated = True
+            self.miniboss = None
+
+        # ถ้า player ถึง LV 10 แล้วยังไม่ได้เรียกมินิบอส → สปอว์น
+        if (
+                not self.miniboss_spawned
+                and not self.miniboss_defeated
+                and self.player.level >= MINIBOSS_TRIGGER_LEVEL
+        ):
+            self.spawn_miniboss()
+
+        self.prefetch_assets(elapsed_sec)
+        profiler.lap('bosses')
+
+        # arrow vs enemy collisions
+        self.resolve_arrow_hits()
+        profiler.lap('arrow_hits')
+
+        if not self.class_chosen and self.player.level >= CLASS_CHOICE_LEVEL and not self.showing_class_menu:
+            self.showing_class_menu = True
+            self.prefetch_assets(elapsed_sec)  # decodes while the player decides
+            choice = self.controls.choose_class(self)
+            if choice:  # bots may stay soldier
                 self.player.change_job(choice)
-                self.class_chosen = True
-                self.showing_class_menu = False
+            self.class_chosen = True
+            self.showing_class_menu = False
 
-            # check if player is dead
-            if self.player.is_dead and self.player.death_done:
+        # check if player is dead
+        if self.player.is_dead and self.player.death_done:
+            if not self.headless:
                 self.show_game_over()
-                self._log_run(False)
-                self.running=False
+            self._log_run(False)
+            self.running=False
 
-            if self.elite and self.elite.is_dead:
+        if self.elite and self.elite.is_dead:
+            if not self.headless:
                 self.show_victory()
-                self._log_run(True)
-                self.running = False
+            self._log_run(True)
+            self.running = False
+        profiler.lap('ui')  # class menu, game over / victory screens
 
-            # draw
-            self.display_surface.fill('black')
-            self.all_sprites.draw(self.player.hitbox_rect.center)
-            self.draw_boss_hud()
-            self.draw_timer()
-            self.draw_health_bar()
-            pygame.display.update()
+    def draw(self):
+        profiler = self.profiler
+        self.display_surface.fill('black')
+        self.all_sprites.draw(self.player.hitbox_rect.center)
+        profiler.lap('draw.world')
+        self.draw_boss_hud()
+        self.draw_timer()
+        self.draw_health_bar()
+        profiler.lap('draw.hud')
+        profiler.draw_overlay(self.display_surface)
+        pygame.display.update()
+        profiler.lap('present')
 
-        pygame.quit()
-        sys.exit()
 
     def show_victory(self):
-        font = pygame.font.SysFont(None, 60)
+        font = get_font(60)
         msg = font.render("Glory to the Victor – The Crusade Ends in Light", True, (255, 255, 0))
         r = msg.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
         self.display_surface.fill('black')
@@ -280,11 +439,10 @@ class Game:
         pygame.time.delay(4000)
 
     def draw_timer(self):
-        elapsed = (pygame.time.get_ticks() - self.start_time) // 1000
+        elapsed = (self.clock.get_ticks() - self.start_time) // 1000
         mins, secs = divmod(elapsed, 60)
         txt = f"{mins:02}:{secs:02}"
-        font = pygame.font.SysFont(None, 40)
-        surf = font.render(txt, True, (255, 255, 255))
+        surf = self.hud.text('timer', txt, 40, (255, 255, 255))
         self.display_surface.blit(surf, surf.get_rect(topright=(WINDOW_WIDTH - 20, 20)))
 
     def draw_boss_hud(self):
@@ -298,12 +456,11 @@ class Game:
         y = WINDOW_HEIGHT - bar_h - 30
         ratio = max(boss.hp, 0) / boss.max_hp
 
-        # ---------- วาด ----------
-        pygame.draw.rect(self.display_surface, (50, 50, 50), (x, y, bar_w, bar_h))
-        pygame.draw.rect(self.display_surface, (200, 0, 0), (x, y, bar_w * ratio, bar_h))
+        # ---------- วาด (ใช้ surface ที่ cache ไว้ ถ้าค่าไม่เปลี่ยน) ----------
+        bar = self.hud.bar('boss_hp', (bar_w, bar_h), int(bar_w * ratio), (50, 50, 50), (200, 0, 0))
+        self.display_surface.blit(bar, (x, y))
 
-        font = pygame.font.SysFont(None, 30)
-        name_surf = font.render(boss.type.upper(), True, (255, 255, 255))
+        name_surf = self.hud.text('boss_name', boss.type.upper(), 30, (255, 255, 255))
         self.display_surface.blit(name_surf, name_surf.get_rect(midbottom=(WINDOW_WIDTH // 2, y - 6)))
 
     def draw_health_bar(self):
@@ -313,20 +470,18 @@ class Game:
         y = 20
         ratio = max(self.player.health,0)/self.player.max_health
         cw = int(bw * ratio)
-        pygame.draw.rect(self.display_surface,(50,50,50),(x,y,bw,bh))
-        pygame.draw.rect(self.display_surface,(200,0,0),(x,y,cw,bh))
+        self.display_surface.blit(self.hud.bar('hp', (bw, bh), cw, (50, 50, 50), (200, 0, 0)), (x, y))
 
         bar_w, bar_h = 200, 18
         x, y = 20, 60
         ratio = self.player.exp / self.player.exp_needed
-        pygame.draw.rect(self.display_surface, (40, 40, 40), (x, y, bar_w, bar_h))
-        pygame.draw.rect(self.display_surface, (0, 120, 255), (x, y, bar_w * ratio, bar_h))
-        font = pygame.font.SysFont(None, 26)  # local
-        lvl_txt = font.render(f"LV {self.player.level}", True, (255, 255, 0))
+        exp_bar = self.hud.bar('exp', (bar_w, bar_h), int(bar_w * ratio), (40, 40, 40), (0, 120, 255))
+        self.display_surface.blit(exp_bar, (x, y))
+        lvl_txt = self.hud.text('level', f"LV {self.player.level}", 26, (255, 255, 0))
         self.display_surface.blit(lvl_txt, (x, y - 22))
 
     def show_game_over(self):
-        font = pygame.font.SysFont(None,120)
+        font = get_font(120)
         txt = font.render("GAME OVER", True, (255,0,0))
         r = txt.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2))
         self.display_surface.fill('black')
@@ -335,30 +490,23 @@ class Game:
         pygame.time.delay(2000)
 
     def show_class_menu(self, screen):
-        font = pygame.font.SysFont(None, 70)
-        knight_btn  = pygame.Rect(0, 0, 300, 90)
-        knight_btn.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 120)
-        wizard_btn = pygame.Rect(0, 0, 300, 90);
-        wizard_btn.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
-        judiciar_btn = pygame.Rect(0, 0, 300, 90);
-        judiciar_btn.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 120)
-
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT: pygame.quit(); sys.exit()
-                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    if knight_btn.collidepoint(event.pos):   return "knight"
-                    if wizard_btn.collidepoint(event.pos):   return "wizard"
-                    if judiciar_btn.collidepoint(event.pos): return "judiciar"
+        buttons = {}
+        for job, dy, label_x in (("knight", -120, 65), ("wizard", 0, 65), ("judiciar", 120, 50)):
+            rect = pygame.Rect(0, 0, 300, 90)
+            rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + dy)
+            buttons[job] = Button(rect, job.capitalize(), 70, (label_x, 15), color=(180, 180, 180))
 
+        def draw(screen):
             screen.fill((25, 25, 25))
-            pygame.draw.rect(screen, (180, 180, 180), knight_btn);
-            screen.blit(font.render("Knight", True, (0, 0, 0)), knight_btn.move(65, 15))
-            pygame.draw.rect(screen, (180, 180, 180), wizard_btn);
-            screen.blit(font.render("Wizard", True, (0, 0, 0)), wizard_btn.move(65, 15))
-            pygame.draw.rect(screen, (180, 180, 180), judiciar_btn);
-            screen.blit(font.render("Judiciar", True, (0, 0, 0)), judiciar_btn.move(50, 15))
-            pygame.display.update()
+            for button in buttons.values():
+                button.draw(screen)
+
+        def handle(event):
+            for job, button in buttons.items():
+                if button.clicked(event):
+                    return job
+
+        return UILoop(screen, draw).run(handle)
 
     def _miniboss_progress(self) -> str:
         killed = []
@@ -369,7 +517,7 @@ class Game:
         return ",".join(killed) or "none"
 
     def _log_run(self, victory: bool):
-        secs = (pygame.time.get_ticks() - self.start_time) // 1000
+        secs = (self.clock.get_ticks() - self.start_time) // 1000
         row = [
             self.player_name,
             secs,
@@ -378,20 +526,15 @@ class Game:
             self._miniboss_progress(),
             int(victory)  # 1 ถ้าชนะ, 0 ถ้าตาย
         ]
-
-        write_header = not os.path.exists(CSV_PATH)
-        with open(CSV_PATH, "a", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            if write_header:
-                w.writerow(["Player", "Play_Time_Sec", "Class", "Level",
-                            "Miniboss_Killed", "Beat_Final_Boss"])
-            w.writerow(row)
+        self.result = row
+        if self.run_store is None:  # e.g. simulations that collect rows themselves
+            return
+        # queued; written on the store's own thread, not the game loop
+        self.run_store.add(row)
+        self.run_store.flush()
 
 def show_menu(screen):
     """ แสดงหน้าเมนูหลัก มีตัวเลือก Play, Leaderboard, Quit """
-    font = pygame.font.SysFont(None, 80)
-    clock = pygame.time.Clock()
-
     # โหลดรูปภาพเมนู (ภาพที่อัปโหลดไว้ ตั้งชื่อไฟล์ตามที่ต้องการ)
     try:
         bg_image = pygame.image.load(join('images', 'menu', 'menu_background.png')).convert()
@@ -402,100 +545,202 @@ def show_menu(screen):
         # ถ้าโหลดไม่ได้ ให้ใส่สีพื้นธรรมดา
         bg_image = None
 
-    # ตำแหน่งของแต่ละปุ่ม
-    play_rect = pygame.Rect(0, 0, 400, 80)
-    leaderboard_rect = pygame.Rect(0, 0, 400, 80)
-    quit_rect = pygame.Rect(0, 0, 400, 80)
-
-    # จัดให้อยู่กึ่งกลางจอ
-    play_rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 100)
-    leaderboard_rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
-    quit_rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 100)
-
-    while True:
-        clock.tick(60)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                mouse_pos = event.pos
-                if play_rect.collidepoint(mouse_pos):
-                    # กดปุ่ม Play -> ดึงชื่อผู้เล่น -> return 'play', ชื่อ
-                    player_name = get_player_name(screen)
-                    return 'play', player_name
-                elif leaderboard_rect.collidepoint(mouse_pos):
-                    # กดปุ่ม Leaderboard (ยังไม่ทำอะไร)
-                    print("Leaderboard clicked (ยังไม่เปิดใช้งาน)")
-                elif quit_rect.collidepoint(mouse_pos):
-                    pygame.quit()
-                    sys.exit()
+    # ปุ่มกึ่งกลางจอ: (ข้อความ, ระยะจากกลางจอแกน y, ระยะ x ของข้อความในปุ่ม)
+    buttons = []
+    for text, dy, label_x in (("Play", -100, 145), ("Leaderboard", 0, 25), ("Quit", 100, 145)):
+        rect = pygame.Rect(0, 0, 400, 80)
+        rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + dy)
+        buttons.append(Button(rect, text, 80, (label_x, 10)))
+    play_btn, leaderboard_btn, quit_btn = buttons
 
+    def draw(screen):
         # วาด background
         if bg_image:
             screen.blit(bg_image, (0, 0))
         else:
             screen.fill((50, 50, 50))
-
-        # วาดปุ่ม Play
-        pygame.draw.rect(screen, (200, 200, 200), play_rect)
-        screen.blit(font.render("Play", True, (0, 0, 0)), (play_rect.x + 145, play_rect.y + 10))
-
-        # วาดปุ่ม Leaderboard
-        pygame.draw.rect(screen, (200, 200, 200), leaderboard_rect)
-        screen.blit(font.render("Leaderboard", True, (0, 0, 0)), (leaderboard_rect.x + 25, leaderboard_rect.y + 10))
-
-        # วาดปุ่ม Quit
-        pygame.draw.rect(screen, (200, 200, 200), quit_rect)
-        screen.blit(font.render("Quit", True, (0, 0, 0)), (quit_rect.x + 145, quit_rect.y + 10))
-
-        pygame.display.update()
+        for button in buttons:
+            button.draw(screen)
+
+    def handle(event):
+        if play_btn.clicked(event):
+            # กดปุ่ม Play -> ดึงชื่อผู้เล่น -> return 'play', ชื่อ
+            return 'play'
+        elif leaderboard_btn.clicked(event):
+            # กดปุ่ม Leaderboard -> เปิดหน้าอันดับ แล้วกลับมาวาดเมนูใหม่
+            show_leaderboard(screen)
+            menu.invalidate()
+        elif quit_btn.clicked(event):
+            pygame.quit()
+            sys.exit()
+
+    menu = UILoop(screen, draw)
+    choice = menu.run(handle)
+    player_name = get_player_name(screen)
+    return choice, player_name
 
 
 def get_player_name(screen):
     """ ฟังก์ชันให้ผู้เล่นกรอกชื่อ ก่อนเข้าเกม """
-    font = pygame.font.SysFont(None, 60)
-    clock = pygame.time.Clock()
+    font = get_font(60)
 
     input_box = pygame.Rect(0, 0, 400, 60)
     input_box.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
-    user_text = ""
-
-    while True:
-        clock.tick(60)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:  # ถ้ากด Enter
-                    return user_text  # ส่งชื่อผู้เล่นกลับ
-                elif event.key == pygame.K_BACKSPACE:
-                    user_text = user_text[:-1]
-                else:
-                    # เพิ่มตัวอักษรลงไป ถ้าต้องการจำกัดความยาวให้เช็คได้
-                    user_text += event.unicode
+    # แสดงข้อความ "Enter your name:" (render ครั้งเดียว)
+    label_surf = font.render("Enter your name:", True, (255, 255, 255))
+    label_rect = label_surf.get_rect(midbottom=(WINDOW_WIDTH // 2, input_box.y - 10))
+    state = {'text': "", 'surf': font.render("", True, (255, 255, 255))}
+
+    def text_rect():
+        return state['surf'].get_rect(topleft=(input_box.x + 10, input_box.y + 10))
 
+    def draw(screen):
         screen.fill((0, 0, 0))
-        # แสดงข้อความ "Enter your name:"
-        label_surf = font.render("Enter your name:", True, (255, 255, 255))
-        label_rect = label_surf.get_rect(midbottom=(WINDOW_WIDTH // 2, input_box.y - 10))
         screen.blit(label_surf, label_rect)
-
         # วาดกล่อง input
         pygame.draw.rect(screen, (255, 255, 255), input_box, 2)
-        text_surf = font.render(user_text, True, (255, 255, 255))
-        screen.blit(text_surf, (input_box.x + 10, input_box.y + 10))
-
-        pygame.display.update()
+        screen.blit(state['surf'], text_rect())
+
+    def handle(event):
+        if event.type != pygame.KEYDOWN:
+            return None
+        if event.key == pygame.K_RETURN:  # ถ้ากด Enter
+            return state['text']  # ส่งชื่อผู้เล่นกลับ
+        old_rect = text_rect()
+        if event.key == pygame.K_BACKSPACE:
+            state['text'] = state['text'][:-1]
+        else:
+            # เพิ่มตัวอักษรลงไป ถ้าต้องการจำกัดความยาวให้เช็คได้
+            state['text'] += event.unicode
+        state['surf'] = font.render(state['text'], True, (255, 255, 255))
+        # วาดใหม่เฉพาะกล่อง input (ชื่อยาวอาจล้นกล่องได้)
+        ui.invalidate(input_box.union(old_rect).union(text_rect()))
+
+    ui = UILoop(screen, draw)
+    return ui.run(handle)
+
+
+def show_leaderboard(screen, log_path=RUNS_DB):
+    """ หน้า Leaderboard: เลือกกระดานด้วย ←/→ เลื่อนทีละหน้าด้วย ↑/↓ หรือ scroll, Esc กลับ """
+    leaderboard = Leaderboard(RunStore(log_path, legacy_csv=legacy_log(log_path)))
+    leaderboard.update()  # ปกติไม่มีอะไรใหม่ (อัปเดตไปแล้วตอนบันทึกผล)
+    names = leaderboard.names()
+    font, title_font = get_font(40), get_font(70)
+    columns = (("#", 140), ("Player", 220), ("Time", 620), ("Class", 760), ("Level", 920), ("Result", 1040))
+    row_h = 40
+    top = 170
+
+    back_rect = pygame.Rect(0, 0, 200, 60)
+    back_rect.midbottom = (WINDOW_WIDTH // 2, WINDOW_HEIGHT - 20)
+    back_btn = Button(back_rect, "Back", 60, (45, 10))
+    prev_rect = pygame.Rect(80, 40, 60, 60)
+    next_rect = pygame.Rect(WINDOW_WIDTH - 140, 40, 60, 60)
+    prev_btn, next_btn = Button(prev_rect, "<", 60, (18, 8)), Button(next_rect, ">", 60, (18, 8))
+    header = [(font.render(text, True, (255, 215, 0)), x) for text, x in columns]
+    state = {'board': 0, 'page': 0}
+
+    def render_page():
+        """Render only the rows of the current page (one surface per row)."""
+        name = names[state['board']] if names else None
+        runs = leaderboard.board(name) if name else []
+        pages = max(1, -(-len(runs) // LEADERBOARD_PAGE_SIZE))
+        state['page'] = min(state['page'], pages - 1)
+        first = state['page'] * LEADERBOARD_PAGE_SIZE
+        rows = []
+        for rank, run in enumerate(runs[first:first + LEADERBOARD_PAGE_SIZE], first + 1):
+            mins, secs = divmod(run[SECS], 60)
+            cells = (str(rank), str(run[PLAYER])[:18], f"{mins:02}:{secs:02}", run[CLASS],
+                     str(run[LEVEL]), "Victory" if run[WON] else "Defeat")
+            rows.append([(font.render(text, True, (255, 255, 255)), x)
+                         for text, (_label, x) in zip(cells, columns)])
+        title = leaderboard.title(name) if name else "Leaderboard"
+        state['title'] = title_font.render(title, True, (255, 255, 255))
+        footer = (f"Page {state['page'] + 1}/{pages}" if runs else "No runs yet") \
+            + "   Left/Right: board   Up/Down: page   Esc: back"
+        state['footer'] = font.render(footer, True, (180, 180, 180))
+        state['rows'] = rows
+        state['pages'] = pages
+
+    def draw(screen):
+        screen.fill((20, 20, 30))
+        screen.blit(state['title'], state['title'].get_rect(center=(WINDOW_WIDTH // 2, 70)))
+        if len(names) > 1:
+            prev_btn.draw(screen)
+            next_btn.draw(screen)
+        for surf, x in header:
+            screen.blit(surf, (x, top - row_h))
+        for i, row in enumerate(state['rows']):
+            for surf, x in row:
+                screen.blit(surf, (x, top + i * row_h))
+        footer_y = top + LEADERBOARD_PAGE_SIZE * row_h + 10
+        screen.blit(state['footer'], state['footer'].get_rect(midtop=(WINDOW_WIDTH // 2, footer_y)))
+        back_btn.draw(screen)
+
+    def turn(board=0, page=0):
+        if names:
+            state['board'] = (state['board'] + board) % len(names)
+        state['page'] = 0 if board else max(0, min(state['page'] + page, state['pages'] - 1))
+        render_page()
+        ui.invalidate()
+
+    def handle(event):
+        if back_btn.clicked(event):
+            return True
+        if prev_btn.clicked(event):
+            turn(board=-1)
+        elif next_btn.clicked(event):
+            turn(board=1)
+        elif event.type == pygame.MOUSEWHEEL:
+            turn(page=-event.y)
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                return True
+            step = {pygame.K_LEFT: (-1, 0), pygame.K_RIGHT: (1, 0),
+                    pygame.K_UP: (0, -1), pygame.K_PAGEUP: (0, -1),
+                    pygame.K_DOWN: (0, 1), pygame.K_PAGEDOWN: (0, 1)}.get(event.key)
+            if step:
+                turn(*step)
+
+    render_page()
+    ui = UILoop(screen, draw)
+    ui.run(handle)
 
 
 # -----------------------------------------------------------------------------
 # ส่วน main เริ่มต้นโปรแกรม: แสดงเมนูก่อน -> เข้าเกม
 # -----------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="The Last Crusade")
+    parser.add_argument('--record', metavar='FILE', help='record inputs + seed to a replay file')
+    parser.add_argument('--replay', metavar='FILE', help='play a replay file back')
+    parser.add_argument('--headless', action='store_true',
+                        help='with --replay: no window, as fast as possible (prints the timing)')
+    parser.add_argument('--seed', type=int, help='seed for a normal or recorded run')
+    parser.add_argument('--profile', metavar='CSV', help='dump per-frame stage timings (ms)')
+    return parser.parse_args(argv)
+
+
+def play_replay(path, headless=False, profile_path=None):
+    """Re-run a recorded game; returns (result row, frames, wall seconds)."""
+    replay = Replay.load(path)
+    game = Game(replay.player_name, headless=headless, seed=replay.seed,
+                profile_path=profile_path,
+                controls=ReplayControls(replay), log_path=None,
+                max_frames=len(replay.frames),
+                clock=FixedStepClock(replay.fps, realtime=not headless))
+    started = time.perf_counter()
+    result = game.run()
+    return result, game.frame, time.perf_counter() - started
+
+
 if __name__ == '__main__':
+    args = parse_args()
+
+    if args.replay:
+        result, frames, secs = play_replay(args.replay, args.headless, args.profile)
+        print(f"{frames} frames in {secs:.2f}s ({frames / max(secs, 1e-9):.0f} fps) -> {result}")
+        sys.exit()
+
     pygame.init()
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption("The Last Crusade")
@@ -504,8 +749,21 @@ if __name__ == '__main__':
     choic, player_name = show_menu(screen)
 
     if choic == 'play':
-        game = Game(player_name)  # ⬅ ส่งชื่อเข้าไป
-        game.run()
+        if args.record:
+            # recorded runs use a fixed step so the replay is frame-exact
+            seed = args.seed if args.seed is not None else random.randrange(2 ** 62)
+            controls = RecordingControls(LiveControls(), args.record, seed, SIM_FPS, player_name)
+            game = Game(player_name, seed=seed, controls=controls,
+                        clock=FixedStepClock(SIM_FPS, realtime=True), profile_path=args.profile)
+            try:
+                game.run()
+            finally:
+                # closing the window in the class menu or game-over screen exits
+                # from inside UILoop, before Game.run gets to finish()
+                controls.finish(game)
+        else:
+            game = Game(player_name, seed=args.seed, profile_path=args.profile)  # ⬅ ส่งชื่อเข้าไป
+            game.run()
 
     else:
         pygame.quit()
@@ -0,0 +1,146 @@
+# mapcache.py
+"""
+Compiled map cache.
+
+load_pygame() parses the .tmx and its .tsx tilesets with pytmx and decodes
+every tile image on each launch. load_map() does that once, then writes a
+compiled copy to MAP_CACHE_DIR:
+
+    ground      tile-index array (row major, 0 = empty) + width/height
+    objects     (x, y, gid) of every decoration in the Objects layer
+    collisions  (x, y, w, h) of every Collisions rect
+    entities    (name, x, y) of the player start and enemy spawn points
+    images      gid -> raw pixels of every tile image used above
+
+The cache remembers the path, mtime and size of the map and every file it
+pulls in (tilesets, tile images); if any of them changes it is rebuilt.
+"""
+import os
+import pickle
+import xml.etree.ElementTree as ET
+from array import array
+from os.path import join, dirname, normpath, basename, splitext
+import pygame
+from settings import TILE_SIZE, MAP_CACHE_DIR
+
+FORMAT_VERSION = 1
+
+
+class CompiledMap:
+    def __init__(self, width, height, ground, objects, collisions, entities, images):
+        self.width = width
+        self.height = height
+        self.ground = ground          # array('I') of gids, width * height
+        self.objects = objects        # [(x, y, gid), ...]
+        self.collisions = collisions  # [(x, y, w, h), ...]
+        self.entities = entities      # [(name, x, y), ...]
+        self.images = images          # gid -> Surface
+
+    def ground_tiles(self):
+        """((x, y), image) in world pixels for every ground tile, row by row."""
+        w, images = self.width, self.images
+        for i, gid in enumerate(self.ground):
+            if gid:
+                yield ((i % w) * TILE_SIZE, (i // w) * TILE_SIZE), images[gid]
+
+
+# ---------- building from the .tmx ----------
+def source_files(tmx_path):
+    """The map plus every tileset and image it references."""
+    files, todo = [], [normpath(tmx_path)]
+    while todo:
+        path = todo.pop()
+        files.append(path)
+        if path.endswith(('.tmx', '.tsx')):
+            for node in ET.parse(path).iter():
+                if node.tag in ('tileset', 'image') and node.get('source'):
+                    todo.append(normpath(join(dirname(path), node.get('source'))))
+    return sorted(set(files))
+
+
+def fingerprint(files):
+    stats = [(path, os.stat(path)) for path in files]
+    return [(path, st.st_mtime_ns, st.st_size) for path, st in stats]
+
+
+def compile_map(tmx_path):
+    from pytmx.util_pygame import load_pygame
+
+    tmx_map = load_pygame(tmx_path)
+    ground_layer = tmx_map.get_layer_by_name('Ground')
+    width, height = ground_layer.width, ground_layer.height
+    ground = array('I', (gid for row in ground_layer.data for gid in row))
+
+    images = {gid: tmx_map.images[gid] for gid in set(ground) if gid}
+    objects = []
+    for obj in tmx_map.get_layer_by_name('Objects'):
+        objects.append((obj.x, obj.y, obj.gid))
+        images[obj.gid] = obj.image
+    collisions = [(obj.x, obj.y, obj.width, obj.height)
+                  for obj in tmx_map.get_layer_by_name('Collisions')]
+    entities = [(obj.name, obj.x, obj.y) for obj in tmx_map.get_layer_by_name('Entities')]
+    return CompiledMap(width, height, ground, objects, collisions, entities, images)
+
+
+# ---------- cache file ----------
+def _pack_image(surf):
+    mode = 'RGBA' if surf.get_flags() & pygame.SRCALPHA else 'RGB'
+    return surf.get_size(), mode, pygame.image.tobytes(surf, mode)
+
+
+def _unpack_image(packed):
+    size, mode, data = packed
+    surf = pygame.image.frombytes(data, size, mode)
+    return surf.convert_alpha() if mode == 'RGBA' else surf.convert()
+
+
+def cache_path(tmx_path):
+    return join(MAP_CACHE_DIR, splitext(basename(tmx_path))[0] + '.mapcache')
+
+
+def save_cache(path, compiled, deps):
+    data = {
+        'version': FORMAT_VERSION,
+        'deps': deps,
+        'size': (compiled.width, compiled.height),
+        'ground': compiled.ground.tobytes(),
+        'objects': compiled.objects,
+        'collisions': compiled.collisions,
+        'entities': compiled.entities,
+        'images': {gid: _pack_image(s) for gid, s in compiled.images.items()},
+    }
+    os.makedirs(dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"  # parallel simulations may race here
+    with open(tmp, 'wb') as f:
+        pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def read_cache(path):
+    """The CompiledMap in path, or None if it is missing or stale."""
+    try:
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('version') != FORMAT_VERSION or fingerprint(p for p, *_ in data['deps']) != data['deps']:
+            return None
+    except (OSError, EOFError, pickle.UnpicklingError, KeyError, TypeError):
+        return None
+    ground = array('I')
+    ground.frombytes(data['ground'])
+    images = {gid: _unpack_image(p) for gid, p in data['images'].items()}
+    return CompiledMap(*data['size'], ground, data['objects'], data['collisions'],
+                       data['entities'], images)
+
+
+def load_map(tmx_path):
+    """The compiled map for tmx_path, from the cache when it is up to date."""
+    path = cache_path(tmx_path)
+    compiled = read_cache(path)
+    if compiled is None:
+        deps = fingerprint(source_files(tmx_path))
+        compiled = compile_map(tmx_path)
+        try:
+            save_cache(path, compiled, deps)
+        except OSError:
+            pass  # read-only install: just parse the .tmx every time
+    return compiled
@@ -0,0 +1,90 @@
+# pathfinding.py
+from collections import deque
+from settings import TILE_SIZE
+
+# orthogonal first, so ties prefer straight moves
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class FlowField:
+    """
+    One shared BFS over the map's tile grid, aimed at the player's tile.
+    Every tile stores the neighbouring tile one step closer to the goal, so an
+    enemy finds its next waypoint with a single lookup however many enemies
+    there are. The field is only recomputed when the goal changes tile.
+    """
+    def __init__(self, width, height, blocked, tile_size=TILE_SIZE):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.blocked = blocked  # list[bool], row major
+        self.goal = None        # (tx, ty)
+        self.next = [-1] * (width * height)  # tile index -> next tile index (-1 = none)
+        self.version = 0        # bumped on every recompute
+
+    @classmethod
+    def from_obstacles(cls, width, height, rects, tile_size=TILE_SIZE):
+        """Mark every tile that overlaps one of the obstacle rects as blocked."""
+        blocked = [False] * (width * height)
+        for r in rects:
+            if r.w <= 0 or r.h <= 0:
+                continue
+            for ty in range(max(0, r.top // tile_size), min(height, (r.bottom - 1) // tile_size + 1)):
+                for tx in range(max(0, r.left // tile_size), min(width, (r.right - 1) // tile_size + 1)):
+                    blocked[ty * width + tx] = True
+        return cls(width, height, blocked, tile_size)
+
+    def tile_of(self, pos):
+        """Tile index of a world position, or -1 outside the map."""
+        tx, ty = int(pos[0]) // self.tile_size, int(pos[1]) // self.tile_size
+        if 0 <= tx < self.width and 0 <= ty < self.height:
+            return ty * self.width + tx
+        return -1
+
+    def retarget(self, pos):
+        """Aim the field at pos; recomputes only if pos is on a new tile."""
+        tile = self.tile_of(pos)
+        if tile == self.goal:
+            return False
+        self.goal = tile
+        self._compute(tile)
+        return True
+
+    def _compute(self, goal):
+        w, h, blocked = self.width, self.height, self.blocked
+        nxt = [-1] * (w * h)
+        if goal >= 0:
+            seen = [False] * (w * h)
+            seen[goal] = True  # the goal counts as open even if the player clips an obstacle
+            queue = deque([goal])
+            while queue:
+                tile = queue.popleft()
+                x, y = tile % w, tile // w
+                for dx, dy in NEIGHBOURS:
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < w and 0 <= ny < h):
+                        continue
+                    n = ny * w + nx
+                    if seen[n]:
+                        continue
+                    # no cutting corners: both orthogonal tiles must be open
+                    if dx and dy and (blocked[y * w + nx] or blocked[ny * w + x]):
+                        continue
+                    seen[n] = True
+                    nxt[n] = tile  # one step from n towards the goal
+                    # a blocked tile only leads out (an enemy half on a rock
+                    # steps back onto open ground); paths never go through it
+                    if not blocked[n]:
+                        queue.append(n)
+        self.next = nxt
+        self.version += 1
+
+    def waypoint(self, pos, goal_pos):
+        """Where an enemy at pos should head: the centre of its next tile, or
+        straight at goal_pos once it is on the goal tile (or off the field)."""
+        tile = self.tile_of(pos)
+        step = self.next[tile] if tile >= 0 else -1
+        if step < 0:
+            return goal_pos
+        size = self.tile_size
+        return ((step % self.width) * size + size // 2, (step // self.width) * size + size // 2)
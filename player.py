@@ -1,21 +1,32 @@
-import pygame, os, math
-from os.path import join, exists
-from os import walk
-from random import randint
+import pygame, math
+from os.path import join
 import settings
 from settings import (
     WINDOW_WIDTH, WINDOW_HEIGHT,
     EXP_BASE, EXP_GROWTH_RATE,
 )
 from sprites import Arrow
+from assets import get_projectile, load_frames
+from timing import REAL_CLOCK
+from controls import LiveControls
 from pygame import Vector2
 
+PLAYER_STATES = [
+    'idle_left', 'idle_right', 'walk_left', 'walk_right',
+    'attack_melee_left', 'attack_melee_right',
+    'attack_bow_left', 'attack_bow_right',
+    'hurt_left', 'hurt_right',
+    'death_left', 'death_right']
+
 class Player(pygame.sprite.Sprite):
-    def __init__(self, pos, groups, collision_sprites, arrow_group, enemy_sprites):
+    def __init__(self, pos, groups, collision_sprites, arrow_group, enemy_sprites,
+                 clock=None, controls=None):
         super().__init__(groups)
         self.collision_sprites = collision_sprites
         self.arrow_group       = arrow_group
         self.enemy_sprites     = enemy_sprites
+        self.clock             = clock or REAL_CLOCK        # game time (ms)
+        self.controls          = controls or LiveControls()  # keyboard/mouse source
 
         # Health & death state
         self.max_health = 100
@@ -40,12 +51,7 @@ class Player(pygame.sprite.Sprite):
         self.last_special = 0
 
         # Load all animations
-        self.animations = {state: [] for state in [
-            'idle_left', 'idle_right', 'walk_left', 'walk_right',
-            'attack_melee_left', 'attack_melee_right',
-            'attack_bow_left', 'attack_bow_right',
-            'hurt_left', 'hurt_right',
-            'death_left', 'death_right']}
+        self.animations = {state: [] for state in PLAYER_STATES}
         self.load_player_images()
         self.prev_lmb = self.prev_rmb = False
 
@@ -122,30 +128,13 @@ class Player(pygame.sprite.Sprite):
     #      LOAD SPRITE SHEETS ตาม 'job' ปัจจุบัน
     # --------------------------------------------
     def load_player_images(self, job: str = None):
+        """Frames come from the shared cache (the job's atlas when it has been built)."""
         job = job or self.job
         base_folder = join('images', job)
-        scale_factor = 2.0
 
         for state in self.animations.keys():
-            folder_path = join(base_folder, state)
-            frames = []
-
-            if not exists(folder_path):
-                # ถ้าโฟลเดอร์นี้ไม่มี ให้ใส่ surface เปล่าแทน
-                self.animations[state] = [pygame.Surface((64, 64))]
-                continue
-
-            for _, _, fnames in walk(folder_path):
-                numeric_files = sorted([
-                    f for f in fnames
-                    if f.endswith('.png') and f.rsplit('.', 1)[0].isdigit()
-                ], key=lambda x: int(x.split('.')[0]))
-
-                for f in numeric_files:
-                    surf = pygame.image.load(join(folder_path, f)).convert_alpha()
-                    w, h = int(surf.get_width() * scale_factor), int(surf.get_height() * scale_factor)
-                    frames.append(pygame.transform.scale(surf, (w, h)))
-
+            frames = load_frames(base_folder, state, 2.0)
+            # ถ้าโฟลเดอร์นี้ไม่มี ให้ใส่ surface เปล่าแทน
             self.animations[state] = frames or [pygame.Surface((64, 64))]
 
     def take_damage(self, amt):
@@ -160,7 +149,7 @@ class Player(pygame.sprite.Sprite):
 
     def die(self):
         self.is_dead = True
-        self.death_time = pygame.time.get_ticks()
+        self.death_time = self.clock.get_ticks()
         self.state = 'death_left' if 'left' in self.state else 'death_right'
         self.frame_index = 0
 
@@ -174,7 +163,8 @@ class Player(pygame.sprite.Sprite):
         self.rect.center = self.hitbox_rect.center
 
     def collision(self, direction):
-        for sprite in self.collision_sprites:
+        # only obstacles near the hitbox (follows the hitbox as it is snapped)
+        for sprite in self.collision_sprites.iter_overlapping(self.hitbox_rect):
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.direction.x > 0:
@@ -193,7 +183,7 @@ class Player(pygame.sprite.Sprite):
             return
 
         # ---------------- Movement ----------------
-        keys = pygame.key.get_pressed()
+        keys = self.controls.get_pressed()
         self.direction.x = (keys[pygame.K_d] or keys[pygame.K_RIGHT]) - (keys[pygame.K_a] or keys[pygame.K_LEFT])
         self.direction.y = (keys[pygame.K_s] or keys[pygame.K_DOWN]) - (keys[pygame.K_w] or keys[pygame.K_UP])
         if self.direction.length() > 0:
@@ -205,12 +195,12 @@ class Player(pygame.sprite.Sprite):
             self.facing = "right"
 
         # ---------------- Mouse ----------------
-        lmb, _, rmb = pygame.mouse.get_pressed()
+        lmb, _, rmb = self.controls.get_mouse_pressed()
         just_lmb = lmb and not self.prev_lmb
         just_rmb = rmb and not self.prev_rmb
         self.prev_lmb, self.prev_rmb = lmb, rmb
 
-        now = pygame.time.get_ticks()
+        now = self.clock.get_ticks()
 
         # ── R-CLICK (สกิล/ยิงธนู) ────────────────────────────────
         if just_rmb \
@@ -270,9 +260,8 @@ class Player(pygame.sprite.Sprite):
         melee_range = 120  # เพิ่มระยะให้ตีโดนง่ายขึ้น
         center = self.hitbox_rect.center
         base = settings.MELEE_BASE_DMG + settings.MELEE_DMG_PER_LEVEL * (self.level - 1)
-        for e in self.enemy_sprites:
-            if Vector2(e.rect.center).distance_to(center) <= melee_range:
-                e.take_damage(base)
+        for e in self.enemy_sprites.query_radius(center, melee_range):
+            e.take_damage(base)
 
     def queue_arrow_shot(self):
         """กำหนดเฟรมที่จะปล่อยลูกธนูให้ตรงกับจำนวนเฟรมจริงของอนิเมชัน"""
@@ -291,14 +280,14 @@ class Player(pygame.sprite.Sprite):
         # ฟังก์ชันจริงที่สร้างกระสุน + เซ็ตคูลดาวน์
         def _do_fire():
             self.wizard_fire_arrow()
-            self.last_special = pygame.time.get_ticks()  # เริ่มคูลดาวน์หลังปล่อยจริง
+            self.last_special = self.clock.get_ticks()  # เริ่มคูลดาวน์หลังปล่อยจริง
 
         self._add_pending(trigger, _do_fire)
 
     def fire_arrow(self):
         """ยิงลูกธนู (Soldier) หรือใช้เป็น fallback projectile"""
         # ---------- ทิศทาง ----------
-        mouse_pos = Vector2(pygame.mouse.get_pos())
+        mouse_pos = Vector2(self.controls.get_mouse_pos())
         center_scr = Vector2(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
         direction = (mouse_pos - center_scr).normalize() if mouse_pos != center_scr else Vector2(1, 0)
 
@@ -306,22 +295,13 @@ class Player(pygame.sprite.Sprite):
         offset = Vector2(+30, -10) if self.facing == 'right' else Vector2(-30, -10)
         spawn_pos = Vector2(self.rect.center) + offset
 
-        # ---------- หา “รูป” กระสุน ----------
-        folder = join('images', 'projectiles', 'arrow')  # <— แนะนำให้ทำโฟลเดอร์นี้
-        if os.path.isdir(folder):
-            frames = [join(folder, f)
-                      for f in sorted(os.listdir(folder))
-                      if f.endswith('.png')]
-            img_arg = frames
-        else:  # ไม่มีโฟลเดอร์ => ใช้ไฟล์เดี่ยว
-            img_arg = join('images', 'projectiles', 'arrow.png')
-
         Arrow(
-            img_arg,
+            get_projectile('arrow'),
             spawn_pos,
             direction,
             (self.arrow_group, self.groups()[0]),  # → AllSprites + arrow_group
             self.collision_sprites,
+            clock=self.clock,
             damage=settings.ARROW_BASE_DMG + settings.ARROW_DMG_PER_LEVEL * (self.level - 1),
             speed=300  # เร็วขึ้นให้สังเกตง่าย
         )
@@ -340,9 +320,8 @@ class Player(pygame.sprite.Sprite):
             hit.midright = (self.hitbox_rect.left + 2, self.hitbox_rect.centery - 6)
 
         dmg = settings.KNIGHT_SLASH_BASE + settings.KNIGHT_SLASH_PER_LVL * (self.level - 1)
-        for e in self.enemy_sprites:
-            if hit.colliderect(e.hitbox_rect):
-                e.take_damage(dmg)
+        for e in self.enemy_sprites.query_rect(hit):
+            e.take_damage(dmg)
 
         self.debug_attack_shapes.append(("rect", hit.copy()))
 
@@ -357,9 +336,8 @@ class Player(pygame.sprite.Sprite):
                             self.hitbox_rect.centery - 6)
 
         self.debug_attack_shapes.append(("rect", hit.copy()))
-        for e in self.enemy_sprites:
-            if hit.colliderect(e.hitbox_rect):
-                e.take_damage(180 + 8 * (self.level - 1))
+        for e in self.enemy_sprites.query_rect(hit):
+            e.take_damage(180 + 8 * (self.level - 1))
 
         # -------------------------------------------------
         #                 WIZARD ATTACKS
@@ -370,32 +348,25 @@ class Player(pygame.sprite.Sprite):
         radius = 65
         center = self.rect.midright if self.facing == "right" else self.rect.midleft
 
-        for e in self.enemy_sprites:
-            if Vector2(e.rect.center).distance_to(center) <= radius:
-                e.take_damage(140 + 7 * (self.level - 1))
+        for e in self.enemy_sprites.query_radius(center, radius):
+            e.take_damage(140 + 7 * (self.level - 1))
 
         self.debug_attack_shapes.append(
             ("circle", (center, radius)))
 
     def wizard_fire_arrow(self):
         """ยิงลูกไฟไปยังตำแหน่งเมาส์ (projectile แบบอนิเมชันลูป)"""
-        target = Vector2(pygame.mouse.get_pos())
+        target = Vector2(self.controls.get_mouse_pos())
         dir_vec = (target - Vector2(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)).normalize()
         spawn = Vector2(self.rect.center) + (Vector2(+30, -10) if self.facing == "right"
                                              else Vector2(-30, -10))
 
-        # ----- โหลดเฟรมภาพทั้งหมดในโฟลเดอร์ fire_arrow -----
-        folder = "images/wizard/fire_arrow"
-        if os.path.isdir(folder):
-            frames = [join(folder, f) for f in sorted(os.listdir(folder)) if f.endswith(".png")]
-        else:  # ถ้าเผลอลืมไฟล์
-            frames = [join('images', 'projectiles', 'fireball.png')]
-
-        Arrow(frames,  # << เปลี่ยนจาก path เดี่ยว เป็น list
+        Arrow(get_projectile('fire_arrow'),  # เฟรมหมุนไว้แล้วใน cache
               spawn,
               dir_vec,
               (self.arrow_group, self.groups()[0]),
               self.collision_sprites,
+              clock=self.clock,
               damage=150 + 6 * (self.level - 1),
               speed=500)
 
@@ -410,9 +381,8 @@ class Player(pygame.sprite.Sprite):
         dmg = (settings.JUDICIAR_SPIN_BASE +
                settings.JUDICIAR_SPIN_PER_LV * (self.level - 1))
 
-        for e in self.enemy_sprites:
-            if Vector2(e.rect.center).distance_to(center) <= radius:
-                e.take_damage(dmg)
+        for e in self.enemy_sprites.query_radius(center, radius):
+            e.take_damage(dmg)
 
         # ตั้งอนิเมชัน (ใช้ชุด ‘attack_melee_...’ เดิม)
         self.state = "attack_melee_" + self.facing
@@ -432,9 +402,8 @@ class Player(pygame.sprite.Sprite):
                             self.hitbox_rect.centery - 6)
 
         self.debug_attack_shapes.append(("rect", hit.copy()))
-        for e in self.enemy_sprites:
-            if hit.colliderect(e.hitbox_rect):
-                e.take_damage(130 + 7 * (self.level - 1))
+        for e in self.enemy_sprites.query_rect(hit):
+            e.take_damage(130 + 7 * (self.level - 1))
 
     def animate(self, dt):
         frames = self.animations.get(self.state, [pygame.Surface((64, 64))])
@@ -462,7 +431,7 @@ class Player(pygame.sprite.Sprite):
 
     def update(self, dt):
         self.input()
-        now = pygame.time.get_ticks()
+        now = self.clock.get_ticks()
 
         if self.arrow_ready_time and now >= self.arrow_ready_time:
             self.fire_arrow()
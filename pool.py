@@ -0,0 +1,79 @@
+# pool.py
+from sprites import Enemy
+from settings import ENEMY_POOL_MAX_FREE
+
+
+class EnemyPool:
+    """
+    Recycles regular enemies instead of building a new Enemy per spawn.
+    Dead or cleared enemies go back to a free list per enemy type; acquire()
+    takes one from there and restarts it with Enemy.reset(), and only builds
+    a new Enemy when the list is empty. Each list keeps at most max_free
+    enemies, the rest are left to the garbage collector. With a HordeEngine,
+    every live enemy holds one of its slots.
+    """
+    def __init__(self, groups, collision_sprites, player, clock=None,
+                 max_free=ENEMY_POOL_MAX_FREE, flow_field=None, horde=None):
+        self.groups = groups
+        self.collision_sprites = collision_sprites
+        self.player = player
+        self.clock = clock
+        self.flow_field = flow_field
+        self.horde = horde
+        self.max_free = max_free
+        self.free = {}  # enemy_type -> [Enemy]
+        self.stats = {'created': 0, 'reused': 0, 'released': 0, 'dropped': 0}
+
+    def _build(self, pos, enemy_type, level, base_hp, base_dmg, path, exp_reward, groups):
+        enemy = Enemy(pos, enemy_type, level, base_hp, base_dmg, path, groups,
+                      self.collision_sprites, self.player, exp_reward, clock=self.clock,
+                      flow_field=self.flow_field)
+        enemy.pool = self
+        self.stats['created'] += 1
+        return enemy
+
+    def acquire(self, pos, enemy_type, level, base_hp, base_dmg, path, exp_reward):
+        """A live enemy in the pool's groups, reused when one is free."""
+        free = self.free.get(enemy_type)
+        if not free:
+            enemy = self._build(pos, enemy_type, level, base_hp, base_dmg, path,
+                                exp_reward, self.groups)
+        else:
+            enemy = free.pop()
+            enemy.reset(pos, enemy_type, level, base_hp, base_dmg, path, exp_reward)
+            enemy.add(*self.groups)
+            self.stats['reused'] += 1
+        if self.horde is not None and self.horde.handles(enemy):
+            self.horde.attach(enemy)
+        return enemy
+
+    def release(self, enemy):
+        """Take enemy out of the game and keep it for the next spawn of its type."""
+        if not enemy.alive():  # already released
+            return
+        enemy.kill()
+        if enemy.horde is not None:
+            enemy.horde.detach(enemy)
+        if enemy.pool is not self:
+            return
+        free = self.free.setdefault(enemy.type, [])
+        if len(free) < self.max_free:
+            free.append(enemy)
+            self.stats['released'] += 1
+        else:
+            self.stats['dropped'] += 1
+
+    def prewarm(self, enemy_type, count, base_hp, base_dmg, path, exp_reward):
+        """Build enemies up front (outside any group) so early spawns only reset."""
+        free = self.free.setdefault(enemy_type, [])
+        while len(free) < min(count, self.max_free):
+            free.append(self._build((0, 0), enemy_type, 1, base_hp, base_dmg, path,
+                                    exp_reward, ()))
+
+    def clear(self, enemies):
+        """Release every enemy in an iterable (e.g. before a boss fight)."""
+        for enemy in list(enemies):
+            self.release(enemy)
+
+    def free_count(self):
+        return sum(len(free) for free in self.free.values())
@@ -0,0 +1,93 @@
+# profiler.py
+import csv
+from collections import deque
+from time import perf_counter
+import pygame
+from hud import get_font
+
+# Frame stages in the order Game.run passes them.
+STAGES = (
+    'events', 'update.player', 'update.enemies', 'update.arrows',
+    'bosses', 'arrow_hits', 'ui', 'draw.world', 'draw.hud', 'present',
+)
+
+
+class FrameProfiler:
+    """
+    Per-stage frame timings. Game calls begin_frame(), then lap(stage) after
+    each stage (time since the previous lap), then end_frame().
+    Keeps a rolling window for the overlay and optionally dumps every frame
+    to a CSV file (milliseconds).
+    """
+    def __init__(self, window=300, dump_path=None):
+        self.history = {stage: deque(maxlen=window) for stage in STAGES + ('frame',)}
+        self.current = dict.fromkeys(STAGES, 0.0)
+        self.frame_start = self.last = 0.0
+        self.frames = 0
+        self.visible = False
+        self._font = None
+        self._overlay = None  # cached overlay surface, rebuilt every few frames
+
+        self._dump_file = None
+        if dump_path:
+            self._dump_file = open(dump_path, 'w', newline='', encoding='utf-8')
+            self._dump = csv.writer(self._dump_file)
+            self._dump.writerow(('frame',) + STAGES + ('total',))
+
+    def begin_frame(self):
+        self.frame_start = self.last = perf_counter()
+        for stage in self.current:
+            self.current[stage] = 0.0
+
+    def lap(self, stage):
+        now = perf_counter()
+        self.current[stage] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        total = self.last - self.frame_start
+        for stage, secs in self.current.items():
+            self.history[stage].append(secs)
+        self.history['frame'].append(total)
+        if self._dump_file:
+            self._dump.writerow([self.frames] + [f"{self.current[s] * 1000:.3f}" for s in STAGES]
+                                + [f"{total * 1000:.3f}"])
+        self.frames += 1
+
+    def percentiles(self, stage):
+        """(p50, p99) of the rolling window, in ms."""
+        values = sorted(self.history[stage])
+        if not values:
+            return 0.0, 0.0
+        p = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+        return p(0.50), p(0.99)
+
+    def toggle(self):
+        self.visible = not self.visible
+        self._overlay = None
+
+    def draw_overlay(self, surface, pos=(20, 100)):
+        if not self.visible:
+            return
+        if self._overlay is None or self.frames % 15 == 0:
+            if self._font is None:
+                self._font = get_font(22)
+            lines = [f"{'stage':<15}{'p50':>7}{'p99':>7}  ms"]
+            for stage in STAGES + ('frame',):
+                p50, p99 = self.percentiles(stage)
+                lines.append(f"{stage:<15}{p50:>7.2f}{p99:>7.2f}")
+            rendered = [self._font.render(line, True, (230, 230, 230)) for line in lines]
+            w = max(s.get_width() for s in rendered) + 16
+            h = sum(s.get_height() for s in rendered) + 12
+            self._overlay = pygame.Surface((w, h), pygame.SRCALPHA)
+            self._overlay.fill((0, 0, 0, 170))
+            y = 6
+            for s in rendered:
+                self._overlay.blit(s, (8, y))
+                y += s.get_height()
+        surface.blit(self._overlay, pos)
+
+    def close(self):
+        if self._dump_file:
+            self._dump_file.close()
+            self._dump_file = None
@@ -0,0 +1,149 @@
+# replay.py
+"""
+Input recording / replay files (.tlcr).
+
+Layout (little endian):
+    header   <4sBqH   magic b'TLCR', version, seed, sim fps
+    name     <H + utf-8 bytes          player name
+    job      <B + ascii bytes          class picked at level 15 ('' = none)
+    frames   <I + zlib(<BBhh * count)  key bits, mouse button bits, mouse x, y
+
+A replay is only meaningful for a seeded Game on a FixedStepClock, which is
+what main.py --record / --replay set up.
+"""
+import struct
+import zlib
+import pygame
+from controls import LiveControls, KeyState, CLASS_CHOICES
+
+MAGIC = b'TLCR'
+VERSION = 2
+HEADER = struct.Struct('<4sBqH')
+FRAME = struct.Struct('<BBhh')
+
+# Every key Player.input looks at, one bit each.
+RECORDED_KEYS = (pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d,
+                 pygame.K_UP, pygame.K_LEFT, pygame.K_DOWN, pygame.K_RIGHT)
+
+
+class Replay:
+    def __init__(self, seed, fps, player_name='', job='', frames=None):
+        self.seed = seed
+        self.fps = fps
+        self.player_name = player_name
+        self.job = job
+        self.frames = frames if frames is not None else []  # (keys, buttons, x, y)
+
+    def save(self, path):
+        name = self.player_name.encode('utf-8')
+        job = (self.job or '').encode('ascii')
+        packed = b''.join(FRAME.pack(*f) for f in self.frames)
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.fps))
+            f.write(struct.pack('<H', len(name)) + name)
+            f.write(struct.pack('<B', len(job)) + job)
+            f.write(struct.pack('<I', len(self.frames)))
+            f.write(zlib.compress(packed, 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, seed, fps = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a v{VERSION} replay file")
+        pos = HEADER.size
+        (n,) = struct.unpack_from('<H', data, pos); pos += 2
+        name = data[pos:pos + n].decode('utf-8'); pos += n
+        (n,) = struct.unpack_from('<B', data, pos); pos += 1
+        job = data[pos:pos + n].decode('ascii'); pos += n
+        (count,) = struct.unpack_from('<I', data, pos); pos += 4
+        packed = zlib.decompress(data[pos:])
+        frames = list(FRAME.iter_unpack(packed))
+        if len(frames) != count:
+            raise ValueError(f"{path} is truncated ({len(frames)}/{count} frames)")
+        return cls(seed, fps, name, job, frames)
+
+
+def pack_input(keys, buttons, mouse_pos):
+    key_bits = 0
+    for i, k in enumerate(RECORDED_KEYS):
+        if keys[k]:
+            key_bits |= 1 << i
+    button_bits = sum(1 << i for i, b in enumerate(buttons[:3]) if b)
+    return key_bits, button_bits, int(mouse_pos[0]), int(mouse_pos[1])
+
+
+def unpack_input(frame):
+    key_bits, button_bits, x, y = frame
+    keys = KeyState(k for i, k in enumerate(RECORDED_KEYS) if key_bits & (1 << i))
+    buttons = tuple(bool(button_bits & (1 << i)) for i in range(3))
+    return keys, buttons, (x, y)
+
+
+class RecordingControls(LiveControls):
+    """Wraps another input source and records what it gave each frame."""
+    def __init__(self, inner, path, seed, fps, player_name=''):
+        self.inner = inner
+        self.path = path
+        self.replay = Replay(seed, fps, player_name)
+        self.saved = False
+        self.keys, self.buttons, self.mouse_pos = KeyState(), (False, False, False), (0, 0)
+
+    def update(self, game):
+        self.inner.update(game)
+        frame = pack_input(self.inner.get_pressed(), self.inner.get_mouse_pressed(),
+                           self.inner.get_mouse_pos())
+        self.replay.frames.append(frame)
+        # serve exactly what was recorded, so the replay sees the same thing
+        self.keys, self.buttons, self.mouse_pos = unpack_input(frame)
+
+    def get_pressed(self):
+        return self.keys
+
+    def get_mouse_pressed(self):
+        return self.buttons
+
+    def get_mouse_pos(self):
+        return self.mouse_pos
+
+    def choose_class(self, game):
+        job = self.inner.choose_class(game)
+        self.replay.job = job or ''
+        return job
+
+    def finish(self, game):
+        """Save the recording; safe to call again (main also calls it on the way out)."""
+        if self.saved:
+            return
+        self.saved = True
+        self.inner.finish(game)
+        self.replay.save(self.path)
+
+
+class ReplayControls(LiveControls):
+    """Plays a Replay back; stops the game when the recorded frames run out."""
+    def __init__(self, replay):
+        self.replay = replay
+        self.frame = -1
+        self.keys, self.buttons, self.mouse_pos = KeyState(), (False, False, False), (0, 0)
+
+    def update(self, game):
+        self.frame += 1
+        if self.frame >= len(self.replay.frames):
+            game.running = False
+            self.keys, self.buttons = KeyState(), (False, False, False)
+            return
+        self.keys, self.buttons, self.mouse_pos = unpack_input(self.replay.frames[self.frame])
+
+    def get_pressed(self):
+        return self.keys
+
+    def get_mouse_pressed(self):
+        return self.buttons
+
+    def get_mouse_pos(self):
+        return self.mouse_pos
+
+    def choose_class(self, game):
+        return self.replay.job if self.replay.job in CLASS_CHOICES else None
@@ -0,0 +1,123 @@
+# report.py
+"""
+Render every chart of the run log to image files, without a window.
+
+    python report.py                                    # -> reports/*.png
+    python report.py --db runs.db --out screenshots/visualization
+    python report.py --force                            # re-render everything
+
+The runs are read once (RunAnalytics, see analytics.py) and each chart's data
+is computed in this process; the figures are then drawn in parallel, one
+process per CPU core. A chart whose data (and chart code) hashes the same as
+in the last report in --out is not drawn again.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join, exists, abspath, splitext
+
+from settings import RUNS_DB, ANALYTICS_DIR
+
+# chart -> file name (same names as screenshots/visualization)
+REPORT_FILES = {
+    "Histogram": 'hist_play_time',
+    "Boxplot Play Time": 'boxplot_play_time',
+    "Bar Class": 'bar_class',
+    "Bar Miniboss": 'bar_miniboss',
+    "Bar Beat Boss": 'bar_beat_boss',
+    "Win Rate by Class": 'win_rate_by_class',
+    "Scatter Level vs Time": 'scatter_level_time',
+    "Box Time by Class": 'box_time_by_class',
+}
+MANIFEST = 'report.json'
+
+
+def render_chart(name, chart_data, path):
+    """Worker: draw one chart and save it (format from the file extension)."""
+    import matplotlib
+    matplotlib.use('Agg')
+    from charts import CHARTS
+
+    fig = CHARTS[name][1](chart_data)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fig.savefig(tmp, format=splitext(path)[1][1:])
+    os.replace(tmp, path)  # a killed report never leaves half an image
+    return path
+
+
+def chart_hash(chart_data, code):
+    h = hashlib.sha1(code)
+    h.update(pickle.dumps(chart_data, protocol=4))
+    return h.hexdigest()
+
+
+def build_report(db, out, fmt='png', force=False, workers=None):
+    """Render the charts whose data changed; returns {chart: 'rendered' | 'unchanged'}."""
+    from runstore import RunStore
+    from analytics import RunAnalytics
+    import charts
+
+    # one cache per database file (RunAnalytics also checks its identity)
+    cache_dir = ANALYTICS_DIR
+    if abspath(db) != abspath(RUNS_DB):
+        cache_dir = join(ANALYTICS_DIR, hashlib.sha1(abspath(db).encode()).hexdigest()[:16])
+    data = RunAnalytics(RunStore(db), cache_dir)
+    data.refresh()
+
+    os.makedirs(out, exist_ok=True)
+    manifest_path = join(out, MANIFEST)
+    old = {}
+    if not force and exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            old = json.load(f)
+
+    # chart code is part of the hash: editing a plot function redraws it
+    with open(charts.__file__, 'rb') as f:
+        code = f.read()
+
+    hashes, todo, status = {}, [], {}
+    for name, (make_data, _plot) in charts.CHARTS.items():
+        path = join(out, f"{REPORT_FILES.get(name, name)}.{fmt}")
+        chart_data = make_data(data)
+        hashes[path] = chart_hash(chart_data, code)
+        if old.get(path) == hashes[path] and exists(path):
+            status[name] = 'unchanged'
+        else:
+            todo.append((name, chart_data, path))
+            status[name] = 'rendered'
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(render_chart, *zip(*todo)))
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=1)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--db', default=RUNS_DB, help='run store to read')
+    parser.add_argument('--out', default='reports', help='folder for the images')
+    parser.add_argument('--format', default='png', help='png, svg, pdf, ...')
+    parser.add_argument('--force', action='store_true', help='re-render even if unchanged')
+    parser.add_argument('--workers', type=int, default=None, help='default: one per CPU core')
+    args = parser.parse_args(argv)
+    if not exists(args.db):
+        parser.error(f"{args.db} does not exist (play a game, or python runstore.py runs.csv)")
+
+    started = time.perf_counter()
+    status = build_report(args.db, args.out, args.format, args.force, args.workers)
+    for name, state in status.items():
+        print(f"{name:<24} {state}", file=sys.stderr)
+    print(f"{sum(s == 'rendered' for s in status.values())}/{len(status)} charts rendered in "
+          f"{time.perf_counter() - started:.1f}s -> {args.out}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
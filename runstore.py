@@ -0,0 +1,294 @@
+# runstore.py
+"""
+Run log stored in an embedded SQLite database (RUNS_DB) instead of runs.csv.
+
+    python runstore.py runs.csv sim_runs.csv     # import CSV logs (only rows not seen before)
+
+Game._log_run hands its row to RunStore.add(); rows are written in batches,
+one transaction per batch, on a background thread, so the game never waits
+on the disk. Readers (statistic_data.py) query with indexes on Class, Level
+and Beat_Final_Boss instead of re-parsing the whole CSV.
+
+The game's own store (see Game) also takes in the old RUNS_CSV, so no
+logged run is lost; every other store starts empty.
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from os.path import abspath, exists
+
+from settings import RUNS_DB, RUN_BATCH_SIZE
+
+RUN_FIELDS = ["Player", "Play_Time_Sec", "Class", "Level",
+              "Miniboss_Killed", "Beat_Final_Boss"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    Player TEXT,
+    Play_Time_Sec INTEGER,
+    Class TEXT,
+    Level INTEGER,
+    Miniboss_Killed TEXT,
+    Beat_Final_Boss INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_class ON runs (Class);
+CREATE INDEX IF NOT EXISTS runs_level ON runs (Level);
+CREATE INDEX IF NOT EXISTS runs_beat_final_boss ON runs (Beat_Final_Boss);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    rows INTEGER
+);
+"""
+MAX_ID = 2 ** 63 - 1  # largest SQLite rowid
+INSERT = f"INSERT INTO runs ({', '.join(RUN_FIELDS)}) VALUES ({', '.join('?' * len(RUN_FIELDS))})"
+
+
+def _typed(row):
+    """CSV strings -> the column types (ints stay ints for the indexes)."""
+    name, secs, job, level, miniboss, won = row
+    return name, int(secs), job, int(level), miniboss, int(won)
+
+
+class RunStore:
+    """
+    One SQLite file of logged runs. add() only buffers; every batch_size rows
+    (or on flush()/close()) the buffer is written on the writer thread.
+    Reads use their own connection, so any thread may query.
+    """
+    def __init__(self, path=RUNS_DB, legacy_csv=None, batch_size=RUN_BATCH_SIZE):
+        self.path = path
+        self.legacy_csv = legacy_csv  # CSV log to take in on the first connect (RUNS_CSV for the game)
+        self.batch_size = batch_size
+        self.pending = []
+        self.lock = threading.Lock()
+        self.writer = None  # ThreadPoolExecutor(1), started on the first write
+        self.writer_conn = None  # only used on the writer thread
+        self.futures = []  # batches submitted and not yet checked for errors
+        self.listeners = []  # listener(first_id, rows) after each batch, on the writer thread
+
+    # ---------- connection ----------
+    def connect(self):
+        """A new connection with the schema in place (first use imports legacy_csv)."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')  # readers don't block the writer
+        conn.executescript(SCHEMA)
+        if not conn.execute("SELECT 1 FROM meta WHERE key = 'identity'").fetchone():
+            with conn:  # names this database file; a rebuilt runs.db gets a new one
+                conn.execute("INSERT OR IGNORE INTO meta VALUES ('identity', ?)", (uuid.uuid4().hex,))
+        if self.legacy_csv:
+            legacy, self.legacy_csv = self.legacy_csv, None
+            if exists(legacy):
+                self._import(conn, legacy)  # only rows no earlier import took
+        return conn
+
+    # ---------- writes ----------
+    def add(self, row):
+        """Queue one run row (RUN_FIELDS order); written with the next batch."""
+        with self.lock:
+            self.pending.append(_typed(row))
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Write everything queued so far, in the background; returns the Future.
+        Raises the error of an earlier batch that failed (its rows are queued
+        again, so this flush retries them).
+        """
+        with self.lock:
+            if self.writer is None:
+                self.writer = ThreadPoolExecutor(1, thread_name_prefix='runstore')
+            failed = [f.exception() for f in self.futures if f.done() and f.exception()]
+            self.futures = [f for f in self.futures if not f.done()]
+            future = self.writer.submit(self._write_pending)
+            self.futures.append(future)
+        if failed:
+            raise failed[0]
+        return future
+
+    def _write_pending(self):
+        with self.lock:
+            rows, self.pending = self.pending, []
+        if not rows:
+            return 0
+        try:
+            if self.writer_conn is None:
+                self.writer_conn = self.connect()
+            with self.writer_conn:  # one transaction per batch
+                self.writer_conn.executemany(INSERT, rows)
+                last_id = self.writer_conn.execute('SELECT MAX(id) FROM runs').fetchone()[0]
+        except Exception:
+            with self.lock:
+                self.pending[:0] = rows  # not written: keep them for the next flush
+            raise
+        for listener in self.listeners:  # ids of one transaction are consecutive
+            listener(last_id - len(rows) + 1, rows)
+        return len(rows)
+
+    def sync(self):
+        """Block until every queued row is in the database; raises a failed write."""
+        if self.pending or self.writer is not None:
+            self.flush()
+            with self.lock:
+                futures, self.futures = self.futures, []
+            errors = [f.exception() for f in futures if f.exception()]  # waits for each
+            if errors:
+                raise errors[0]
+
+    def close(self):
+        try:
+            self.sync()
+        finally:
+            if self.writer is not None:
+                if self.writer_conn is not None:
+                    self.writer.submit(self.writer_conn.close).result()
+                    self.writer_conn = None
+                self.writer.shutdown()
+                self.writer = None
+
+    # ---------- CSV import ----------
+    def import_csv(self, path):
+        """Append the rows of a runs CSV; returns how many were new."""
+        self.sync()
+        conn = self.connect()
+        try:
+            return self._import(conn, path)
+        finally:
+            conn.close()
+
+    def _import(self, conn, path):
+        # logs only ever grow: skip the rows an earlier import already took
+        key = abspath(path)
+        st = os.stat(path)
+        added = 0
+        with open(path, newline='', encoding='utf-8') as f, conn:
+            conn.execute('BEGIN IMMEDIATE')  # two processes never import the same rows
+            done = conn.execute('SELECT size, mtime_ns, rows FROM imports WHERE path = ?',
+                                (key,)).fetchone()
+            if done and done[:2] == (st.st_size, st.st_mtime_ns):
+                return 0
+            skip = done[2] if done else 0
+
+            reader = csv.reader(f)
+            if next(reader, None) != RUN_FIELDS:
+                raise ValueError(f"{path} is not a runs CSV ({', '.join(RUN_FIELDS)})")
+            batch = []
+            for i, row in enumerate(reader):
+                if i < skip or not row:
+                    continue
+                batch.append(_typed(row))
+                if len(batch) >= self.batch_size:
+                    conn.executemany(INSERT, batch)
+                    added += len(batch)
+                    batch = []
+            conn.executemany(INSERT, batch)
+            added += len(batch)
+            conn.execute('INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?)',
+                         (key, st.st_size, st.st_mtime_ns, skip + added))
+        return added
+
+    # ---------- reads ----------
+    def fetch(self, where='', params=()):
+        """Every run (RUN_FIELDS tuples, log order), optionally filtered by a WHERE clause."""
+        self.sync()
+        conn = self.connect()
+        try:
+            sql = f"SELECT {', '.join(RUN_FIELDS)} FROM runs {'WHERE ' + where if where else ''} ORDER BY id"
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def fetch_since(self, after_id, size=RUN_BATCH_SIZE, upto=None, wait=True):
+        """
+        Yield lists of (id, *RUN_FIELDS) rows logged after row id after_id
+        (up to id upto). wait=False reads only what is already written: a
+        listener runs on the writer thread and must not wait on it.
+        """
+        if wait:
+            self.sync()
+        conn = self.connect()
+        try:
+            cur = conn.execute(f"SELECT id, {', '.join(RUN_FIELDS)} FROM runs "
+                               f"WHERE id > ? AND id <= ? ORDER BY id",
+                               (after_id, MAX_ID if upto is None else upto))
+            while rows := cur.fetchmany(size):
+                yield rows
+        finally:
+            conn.close()
+
+    def get(self, run_id, wait=True):
+        """The RUN_FIELDS tuple of one run by id, or None."""
+        if wait:
+            self.sync()
+        conn = self.connect()
+        try:
+            return conn.execute(f"SELECT {', '.join(RUN_FIELDS)} FROM runs WHERE id = ?",
+                                (run_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def identity(self):
+        """Random id given to the database when it was created (caches compare it)."""
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT value FROM meta WHERE key = 'identity'").fetchone()[0]
+        finally:
+            conn.close()
+
+    def count_upto(self, last_id):
+        """How many runs have an id <= last_id (a rebuilt database shows up here)."""
+        self.sync()
+        conn = self.connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM runs WHERE id <= ?', (last_id,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def count_by(self, column):
+        """[(value, runs)], most common first - served from the column's index."""
+        if column not in RUN_FIELDS:
+            raise ValueError(f"unknown column {column!r}")
+        self.sync()
+        conn = self.connect()
+        try:
+            return conn.execute(f'SELECT {column}, COUNT(*) AS n FROM runs '
+                                f'GROUP BY {column} ORDER BY n DESC, {column}').fetchall()
+        finally:
+            conn.close()
+
+    def __len__(self):
+        self.sync()
+        conn = self.connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+        finally:
+            conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('csv', nargs='+', help='runs CSV files to import')
+    parser.add_argument('--db', default=RUNS_DB)
+    args = parser.parse_args(argv)
+
+    store = RunStore(args.db)
+    for path in args.csv:
+        print(f"{path:<36} +{store.import_csv(path)} runs", file=sys.stderr)
+    print(f"{args.db}: {len(store)} runs", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,31 @@ from os import walk
 
 WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
 TILE_SIZE = 64
+GROUND_CHUNK_SIZE = 512   # ขนาด chunk ของพื้นที่ bake ไว้ (px)
+ENEMY_GRID_CELL = 128   # ขนาดช่อง grid สำหรับหา ศัตรูที่โดนโจมตี (px)
+PRELOAD_ENEMY_FRAMES = True   # โหลดภาพศัตรู/บอสทั้งหมดตอนเริ่มเกม
+ENEMY_SPAWN_MS = 2000         # สปอว์นศัตรูธรรมดาทุก ๆ 2 วิ
+SIM_FPS = 60                  # headless: เฟรมละ 1/SIM_FPS วิ (fixed step)
+PROFILER_KEY = pygame.K_F3    # เปิด/ปิด overlay เวลาแต่ละส่วนของเฟรม
+MENU_MAX_FPS = 30             # เมนู: วาดใหม่ไม่เกินกี่ครั้ง/วิ (รอ event ระหว่างนั้น)
+MAP_CACHE_DIR = 'cache'       # แผนที่ที่คอมไพล์แล้ว (สร้างใหม่เองเมื่อ .tmx/.tsx/ภาพเปลี่ยน)
+ATLAS_DIR = 'images/atlas'    # atlas ภาพตัวละคร (สร้างด้วย python build_assets.py)
+CLASS_CHOICE_LEVEL = 15       # เลเวลที่ให้เลือกคลาส
+PREFETCH_LEVELS_AHEAD = 5     # เริ่มโหลดภาพคลาส/บอสเบื้องหลังก่อนถึงเลเวลกี่เลเวล (EXP มินิบอสข้ามได้หลายเลเวล)
+PREFETCH_SECONDS_AHEAD = 30   # ...และก่อนครบ GAME_TIME_LIMIT กี่วิ (Elite Orc)
+ENEMY_POOL_MAX_FREE = 32      # ศัตรูที่ตายแล้วเก็บไว้ใช้ซ้ำได้สูงสุดกี่ตัว/ชนิด
+ENEMY_POOL_PREWARM = 4        # สร้างศัตรูรอไว้กี่ตัว/ชนิด ตอนเริ่มเกม
+HORDE_ENGINE = True           # ขยับศัตรูธรรมดาทั้งฝูงด้วย numpy ทีเดียว (ถ้าติดตั้ง numpy)
+FLOW_FIELD = True             # ศัตรูเดินอ้อมสิ่งกีดขวางตาม flow field (False = เดินตรงเข้าหาผู้เล่น)
+RUNS_DB = 'runs.db'           # ฐานข้อมูล SQLite เก็บผลการเล่นแต่ละรอบ (ดู runstore.py)
+RUNS_CSV = 'runs.csv'         # log แบบเก่า เกมนำเข้า RUNS_DB ให้ (เฉพาะแถวที่ยังไม่เคยนำเข้า)
+RUN_BATCH_SIZE = 1000         # เขียนลงฐานข้อมูลทีละกี่แถวต่อ transaction
+ANALYTICS_DIR = 'cache/analytics'  # ตารางสรุปผลของ runs.db สำหรับ statistic_data.py / report.py
+LEADERBOARD_K = 100           # เก็บอันดับสูงสุดกี่อันดับต่อกระดาน
+LEADERBOARD_PAGE_SIZE = 10    # แสดงกี่อันดับต่อหน้า
+
+
+PROJECTILE_ANGLE_BUCKETS = 64  # จำนวนมุมที่หมุนภาพกระสุนไว้ล่วงหน้า
 
 
 # ---------- Level / EXP ----------
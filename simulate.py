@@ -0,0 +1,97 @@
+# simulate.py
+"""
+Play many automated, headless runs of Game in parallel (balance tuning).
+
+    python simulate.py --runs 500 --seed 1 --job knight wizard judiciar --policy hunter
+    python simulate.py --runs 200 --job soldier --policy random --out sim_runs.csv
+
+Run i uses seed (seed + i) and cycles through every (job, policy) pair, so
+each class is played by each bot policy equally often.
+Every finished run produces the same row as Game._log_run; the rows are
+merged, in run order, into one CSV (and, with --db, into a run store).
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from settings import SIM_FPS
+
+JOBS = ('soldier', 'knight', 'wizard', 'judiciar')
+
+
+def simulate_run(seed, job, policy, max_seconds):
+    """Play one headless run and return its row (None if it hit max_seconds)."""
+    from main import Game
+    from controls import POLICIES
+
+    game = Game(f"bot-{policy}-{seed}", headless=True, seed=seed,
+                controls=POLICIES[policy](seed, job),
+                log_path=None, max_frames=int(max_seconds * SIM_FPS))
+    return game.run()
+
+
+def plan_runs(runs, seed, jobs, policies, max_seconds):
+    """(seed, job, policy, max_seconds) per run, cycling over the job x policy grid."""
+    combos = list(itertools.product(jobs, policies))
+    return [(seed + i, *combos[i % len(combos)], max_seconds) for i in range(runs)]
+
+
+def run_batch(plan, workers=None):
+    """Fan the planned runs out over a process pool, results in plan order."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(simulate_run, *zip(*plan), chunksize=max(1, len(plan) // 64)))
+
+
+def write_rows(path, rows, append=False):
+    from runstore import RUN_FIELDS
+
+    write_header = not (append and os.path.exists(path))
+    with open(path, "a" if append else "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        if write_header:
+            w.writerow(RUN_FIELDS)
+        w.writerows(rows)
+
+
+def main(argv=None):
+    from controls import POLICIES
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first run')
+    parser.add_argument('--job', nargs='+', choices=JOBS, default=['soldier'],
+                        help='class picked at level 15 (soldier = never change)')
+    parser.add_argument('--policy', nargs='+', choices=sorted(POLICIES), default=['random'])
+    parser.add_argument('--workers', type=int, default=None, help='default: one per CPU core')
+    parser.add_argument('--max-seconds', type=float, default=1200,
+                        help='simulated time limit per run')
+    parser.add_argument('--out', default='sim_runs.csv')
+    parser.add_argument('--append', action='store_true', help='append to --out instead of overwriting')
+    parser.add_argument('--db', metavar='RUNS_DB', help='also add the rows to this run store')
+    args = parser.parse_args(argv)
+
+    plan = plan_runs(args.runs, args.seed, args.job, args.policy, args.max_seconds)
+    started = time.perf_counter()
+    results = run_batch(plan, args.workers)
+    rows = [row for row in results if row is not None]
+    write_rows(args.out, rows, args.append)
+    if args.db:
+        from runstore import RunStore
+
+        store = RunStore(args.db, legacy_csv=None)
+        for row in rows:
+            store.add(row)
+        store.close()
+
+    print(f"{len(rows)}/{len(plan)} runs finished in {time.perf_counter() - started:.1f}s "
+          f"-> {args.out}", file=sys.stderr)
+    if len(rows) < len(plan):
+        print(f"{len(plan) - len(rows)} runs hit --max-seconds and were not logged", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
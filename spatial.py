@@ -0,0 +1,61 @@
+# spatial.py
+from settings import TILE_SIZE
+
+
+class SpatialGrid:
+    """Uniform grid that buckets items by every cell their rect overlaps."""
+    def __init__(self, cell_size=TILE_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> [(order, rect, item), ...]
+        self.count = 0
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        x0, y0 = rect.left // size, rect.top // size
+        x1 = max(x0, (rect.right - 1) // size)
+        y1 = max(y0, (rect.bottom - 1) // size)
+        return x0, y0, x1, y1
+
+    def insert(self, item, rect):
+        """Store item under rect (the rect is kept as given, not copied)."""
+        entry = (self.count, rect, item)
+        self.count += 1
+        x0, y0, x1, y1 = self._cell_range(rect)
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                self.cells.setdefault((cx, cy), []).append(entry)
+
+    def clear(self):
+        self.cells.clear()
+        self.count = 0
+
+    def candidates(self, rect):
+        """Items sharing a cell with rect, in insertion order (no exact test)."""
+        found = {}
+        x0, y0, x1, y1 = self._cell_range(rect)
+        cells = self.cells
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for entry in bucket:
+                        found[entry[0]] = entry
+        return [found[k][2] for k in sorted(found)]
+
+    def query_entries(self, rect):
+        """(order, item) pairs whose stored rect overlaps rect, in insertion order."""
+        found = {}
+        x0, y0, x1, y1 = self._cell_range(rect)
+        cells = self.cells
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    for entry in bucket:
+                        if entry[0] not in found and entry[1].colliderect(rect):
+                            found[entry[0]] = entry[2]
+        return sorted(found.items(), key=lambda e: e[0])
+
+    def query(self, rect):
+        """Items whose stored rect overlaps rect, in insertion order."""
+        return [item for _, item in self.query_entries(rect)]
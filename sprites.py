@@ -1,13 +1,16 @@
-import os
-from os.path import join
-import pygame, random
+import pygame
 from pygame.math import Vector2
 from settings import (
     HP_PER_LEVEL, DMG_PER_LEVEL,
     MINIBOSS_SPECIAL_MULT, MINIBOSS_SPECIAL_CD_MS,
     TILE_SIZE
 )
-import math
+from assets import load_frames, load_projectile, ProjectileFrames
+from timing import REAL_CLOCK
+
+ENEMY_STATES = [
+    'walk_left', 'walk_right', 'attack_left', 'attack_right', 'special_left', 'special_right',
+    'hurt_left', 'hurt_right', 'death_left', 'death_right']
 
 class Sprite(pygame.sprite.Sprite):
     """Basic sprite for ground tiles and decorative map objects."""
@@ -16,6 +19,7 @@ class Sprite(pygame.sprite.Sprite):
         self.image = surf
         self.rect = self.image.get_rect(topleft=pos)
         self.ground = True
+        self.static = True  # never moves (AllSprites keeps it in a grid)
 
 class CollisionSprite(pygame.sprite.Sprite):
     """Invisible sprite used for collision areas."""
@@ -23,6 +27,7 @@ class CollisionSprite(pygame.sprite.Sprite):
         super().__init__(groups)
         self.image = surf
         self.rect = self.image.get_rect(topleft=pos)
+        self.static = True  # never moves (AllSprites keeps it in a grid)
 
 class Enemy(pygame.sprite.Sprite):
     """ศัตรูที่มีเลเวล – HP – ดาเมจตามเลเวล"""
@@ -30,14 +35,23 @@ class Enemy(pygame.sprite.Sprite):
         self, pos, enemy_type, level,
         base_hp, base_dmg, path,
         groups, collision_sprites, player, exp_reward,
-        is_miniboss=False
+        is_miniboss=False, clock=None, flow_field=None
     ):
         super().__init__(groups)
-        self.type   = enemy_type
-        self.level  = level
-        self.path = path
+        self.clock = clock or REAL_CLOCK
         self.player = player
         self.collision_sprites = collision_sprites
+        self.flow_field = flow_field  # FlowField towards the player (None = straight line)
+        self.pool = None  # EnemyPool that recycles this enemy (None = bosses)
+        self.horde = self.slot = None  # HordeEngine slot while in the game (regular enemies)
+        self.path = None
+        self.reset(pos, enemy_type, level, base_hp, base_dmg, path, exp_reward, is_miniboss)
+
+    def reset(self, pos, enemy_type, level, base_hp, base_dmg, path, exp_reward,
+              is_miniboss=False):
+        """(Re)start this enemy's life - used by __init__ and by EnemyPool."""
+        self.type   = enemy_type
+        self.level  = level
         self.exp_reward = exp_reward
         self.is_miniboss = is_miniboss
         self.special_cd = MINIBOSS_SPECIAL_CD_MS
@@ -47,7 +61,6 @@ class Enemy(pygame.sprite.Sprite):
         self.warped = False  # ให้วาร์ปครั้งเดียว
         self.hit_frame_index = 0
         self.attack_range = 60 if is_miniboss else 40
-        self.frames: dict[str, list[pygame.Surface]] = {}
 
         from settings import HP_PER_LEVEL, DMG_PER_LEVEL
         self.max_hp = base_hp + HP_PER_LEVEL * (level - 1)
@@ -67,14 +80,11 @@ class Enemy(pygame.sprite.Sprite):
         self.state = 'walk_right'
         self.frame_index = 0
         self.animation_speed = 12
-        for state in self.frames:
-            if not self.frames[state]:
-                self.frames[state] = [pygame.Surface((32, 32), pygame.SRCALPHA)]
 
-        self.frames = {state: [] for state in [
-            'walk_left', 'walk_right', 'attack_left', 'attack_right','special_left', 'special_right',
-            'hurt_left', 'hurt_right', 'death_left', 'death_right']}
-        self.load_enemy_images()
+        if path != self.path:  # a recycled enemy of the same type keeps its frames
+            self.path = path
+            self.frames = {state: [] for state in ENEMY_STATES}
+            self.load_enemy_images()
 
         self.image = self.frames['walk_right'][0] if self.frames['walk_right'] else pygame.Surface((32, 32))
         self.rect = self.image.get_rect(center=pos)
@@ -82,27 +92,17 @@ class Enemy(pygame.sprite.Sprite):
         self.speed = 80
         self.is_dead = False
 
+    def despawn(self):
+        """Leave the game; pooled enemies go back to their pool's free list."""
+        if self.pool is not None:
+            self.pool.release(self)
+        else:
+            self.kill()
+
     def load_enemy_images(self):
-        scale_factor = 2.0
+        """Frames come from the shared cache - every instance of a type uses the same lists."""
         for state in self.frames.keys():
-            folder = join(self.path, state)
-            temp = []
-
-            if not os.path.exists(folder):
-                self.frames[state] = []
-                continue
-
-            for _, _, fnames in os.walk(folder):
-                numeric_files = sorted([
-                    f for f in fnames if f.endswith('.png') and f.rsplit('.', 1)[0].isdigit()
-                ], key=lambda x: int(x.split('.')[0]))
-
-                for f in numeric_files:
-                    surf = pygame.image.load(join(folder, f)).convert_alpha()
-                    w, h = int(surf.get_width() * scale_factor), int(surf.get_height() * scale_factor)
-                    temp.append(pygame.transform.scale(surf, (w, h)))
-
-            self.frames[state] = temp
+            self.frames[state] = load_frames(self.path, state, 2.0)
 
     def take_damage(self, amt):
         if self.is_dead:
@@ -116,15 +116,21 @@ class Enemy(pygame.sprite.Sprite):
         else:
             self.state = 'hurt_left' if 'left' in self.state else 'hurt_right'
             self.frame_index = 0
+        self._mirror()
+
+    def _mirror(self):
+        if self.horde is not None:  # the HordeEngine keeps its own copy
+            self.horde.mirror(self)
 
     def collision(self):
-        for c in self.collision_sprites:
-            if c.rect.colliderect(self.hitbox_rect):
-                self.hitbox_rect.center = self.rect.center
-                break
+        if self.collision_sprites.query(self.hitbox_rect):
+            self.hitbox_rect.center = self.rect.center
 
     def move(self, dt):
-        direction = (pygame.Vector2(self.player.rect.center) - pygame.Vector2(self.rect.center))
+        target = self.player.rect.center
+        if self.flow_field is not None:  # walk around obstacles, tile by tile
+            target = self.flow_field.waypoint(self.rect.center, target)
+        direction = (pygame.Vector2(target) - pygame.Vector2(self.rect.center))
         if direction.length() > 0:
             direction = direction.normalize()
 
@@ -155,9 +161,11 @@ class Enemy(pygame.sprite.Sprite):
                 and idx >= self.final_hit_frame:
             self.player.take_damage(self.pending_damage)
             self.pending_damage = 0
-        old_mid = self.rect.midbottom
+        old_mid, old_size = self.rect.midbottom, self.rect.size
         self.image = frames[idx]
         self.rect = self.image.get_rect(midbottom=old_mid)
+        if self.rect.size != old_size:
+            self._mirror()  # a frame of another size moves the center
 
         # เดินอนิเมชันรอบเดียว
         self.frame_index += self.animation_speed * dt
@@ -181,9 +189,10 @@ class Enemy(pygame.sprite.Sprite):
         # จบ hurt / attack → กลับเดิน
         if self.frame_index >= len(frames):
             if "death" in self.state:
-                self.kill(); return
+                self.despawn(); return
             if "attack" in self.state or "hurt" in self.state or "special" in self.state:
                 self.state = "walk_left" if "left" in self.state else "walk_right"
+                self._mirror()
             self.frame_index = 0
 
     def update(self, dt):
@@ -196,11 +205,24 @@ class Enemy(pygame.sprite.Sprite):
                 self.move(dt)
         self.animate(dt)
 
+    def follow(self, attack, center, turn, dt):
+        """update() with the distance check and move() already done by HordeEngine."""
+        if not self.is_dead:
+            if attack:
+                self.attack_player()
+                self._mirror()
+            else:
+                if turn:
+                    self.state = 'walk_left' if turn < 0 else 'walk_right'
+                self.hitbox_rect.center = center
+                self.rect.center = center
+        self.animate(dt)
+
     def attack_player(self):
         if self.is_dead:
             return
 
-        now = pygame.time.get_ticks()
+        now = self.clock.get_ticks()
 
         # ---------- ดีเลย์รวม ----------
         if now - self.last_attack_time < self.attack_delay:
@@ -262,26 +284,24 @@ class Enemy(pygame.sprite.Sprite):
             return
 
 class Arrow(pygame.sprite.Sprite):
-    def __init__(self, image_or_list, pos, direction, groups,
-                 collision_sprites, damage=0, speed=350, anim_fps=12):
+    def __init__(self, projectile, pos, direction, groups,
+                 collision_sprites, damage=0, speed=350, anim_fps=12, clock=None):
         super().__init__(groups)
+        self.clock = clock or REAL_CLOCK
 
 
         # -------------------------------------------------
-        # 1) โหลดเฟรมภาพจากไฟล์/ลิสต์ให้เรียบร้อยก่อน
+        # 1) เฟรมภาพมาจาก cache (ProjectileFrames) – ไม่มีการโหลดไฟล์ตอนยิง
+        #    รับ path / list ของ path ได้เหมือนเดิม
         # -------------------------------------------------
-        if isinstance(image_or_list, list):
-            raw_frames = [pygame.image.load(p).convert_alpha()
-                          for p in image_or_list]
-        else:
-            raw_frames = [pygame.image.load(image_or_list).convert_alpha()]
+        if not isinstance(projectile, ProjectileFrames):
+            paths = projectile if isinstance(projectile, list) else [projectile]
+            projectile = load_projectile(paths)
 
         # -------------------------------------------------
-        # 2) หมุนทุกเฟรมให้ตรงกับทิศกระสุน
+        # 2) เลือกชุดเฟรมที่หมุนไว้แล้วตามทิศกระสุน
         # -------------------------------------------------
-        angle = math.degrees(math.atan2(-direction.y, direction.x))
-        self.frames = [pygame.transform.rotate(surf, angle)
-                       for surf in raw_frames]
+        self.frames = projectile.frames_for(direction)
 
         # -------------------------------------------------
         # 3) ตั้งค่าพื้นฐาน
@@ -302,7 +322,7 @@ class Arrow(pygame.sprite.Sprite):
         self.direction  = direction
         self.speed      = speed
         self.damage     = damage
-        self.spawn_time = pygame.time.get_ticks()
+        self.spawn_time = self.clock.get_ticks()
         self.collision_sprites = collision_sprites
 
     def update(self, dt):
@@ -319,6 +339,6 @@ class Arrow(pygame.sprite.Sprite):
         self.hitbox_rect.center = self.rect.center  # ← เพิ่ม
 
         # --- อายุเกิน 2 วิ ลบทิ้ง ---
-        if pygame.time.get_ticks() - self.spawn_time > 2000:
+        if self.clock.get_ticks() - self.spawn_time > 2000:
             self.kill()
 
@@ -1,67 +1,17 @@
 import tkinter as tk
 from tkinter import ttk
-import pandas as pd
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-
-# Load dataset
-df = pd.read_csv('runs.csv')
-
-# Plot functions
-def plot_histogram():
-    fig, ax = plt.subplots()
-    ax.hist(df['Play_Time_Sec'], bins=10)
-    ax.set_title('Distribution of Play Time (sec)')
-    ax.set_xlabel('Play_Time_Sec')
-    return fig
-
-def plot_boxplot_play_time():
-    fig, ax = plt.subplots()
-    ax.boxplot(df['Play_Time_Sec'], vert=False)
-    ax.set_title('Boxplot of Play Time (sec)')
-    ax.set_xlabel('Play_Time_Sec')
-    return fig
-
-def plot_bar_class():
-    fig, ax = plt.subplots()
-    counts = df['Class'].value_counts()
-    counts.plot.bar(ax=ax)
-    ax.set_title('Count by Class')
-    ax.set_ylabel('Number of Players')
-    return fig
-
-def plot_bar_miniboss():
-    fig, ax = plt.subplots()
-    counts = df['Miniboss_Killed'].value_counts()
-    counts.plot.bar(ax=ax)
-    ax.set_title('Count by Miniboss Killed')
-    ax.set_ylabel('Number of Players')
-    return fig
-
-def plot_bar_beat_boss():
-    fig, ax = plt.subplots()
-    counts = df['Beat_Final_Boss'].map({0: 'Lose', 1: 'Win'}).value_counts()
-    counts.plot.bar(ax=ax)
-    ax.set_title('Beat Final Boss (Win vs Lose)')
-    ax.set_ylabel('Number of Players')
-    return fig
-
-def plot_scatter_level_time():
-    fig, ax = plt.subplots()
-    ax.scatter(df['Level'], df['Play_Time_Sec'])
-    ax.set_title('Level vs Play Time (sec)')
-    ax.set_xlabel('Level')
-    ax.set_ylabel('Play_Time_Sec')
-    return fig
-
-def plot_box_time_by_class():
-    fig, ax = plt.subplots()
-    df.boxplot(column='Play_Time_Sec', by='Class', ax=ax)
-    ax.set_title('Play Time by Class')
-    ax.set_xlabel('Class')
-    ax.set_ylabel('Play_Time_Sec')
-    plt.suptitle('')
-    return fig
+from analytics import RunAnalytics
+from charts import CHARTS
+
+# Chart data (see charts.py) is computed on a worker thread, the figures are
+# drawn on the Tk thread. Nothing is read at import time.
+
+FIGURE_CACHE_SIZE = 8        # rendered charts kept for instant switching
+POLL_MS = 30                 # how often the Tk loop checks on the worker
+
 
 # GUI setup
 class App(tk.Tk):
@@ -70,36 +20,86 @@ class App(tk.Tk):
         self.title("Runs Data Visualizer")
         self.geometry("800x600")
 
-        # Dropdown to select plot
-        self.plot_funcs = {
-            "Histogram": plot_histogram,
-            "Boxplot Play Time": plot_boxplot_play_time,
-            "Bar Class": plot_bar_class,
-            "Bar Miniboss": plot_bar_miniboss,
-            "Bar Beat Boss": plot_bar_beat_boss,
-            "Scatter Level vs Time": plot_scatter_level_time,
-            "Box Time by Class": plot_box_time_by_class
-        }
+        # the RunAnalytics lives on the worker: the Tk thread never waits on data
+        self.worker = ThreadPoolExecutor(1, thread_name_prefix='charts')
+        self.analytics = None
+        self.figures = OrderedDict()  # (chart, data version) -> canvas, oldest first
+        self.shown = None
+        self.request = 0  # only the newest Show Plot gets drawn
 
+        # Dropdown to select plot
         self.selected = tk.StringVar(value="Histogram")
-        dropdown = ttk.Combobox(self, textvariable=self.selected, values=list(self.plot_funcs.keys()), state="readonly")
+        dropdown = ttk.Combobox(self, textvariable=self.selected, values=list(CHARTS.keys()), state="readonly")
         dropdown.pack(pady=10)
 
         btn = ttk.Button(self, text="Show Plot", command=self.show_plot)
         btn.pack(pady=5)
 
+        self.status = ttk.Label(self, text="")  # loading indicator
+        self.status.pack()
+
         self.canvas_frame = ttk.Frame(self)
         self.canvas_frame.pack(fill=tk.BOTH, expand=True)
 
-    def show_plot(self):
-        for widget in self.canvas_frame.winfo_children():
-            widget.destroy()
+        # start reading runs.db right away, before the first click
+        self.in_background(None, lambda result: None, "Loading run data...")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    def load_chart(self, name):
+        """Worker thread: take in new runs, then compute the data of chart name."""
+        if self.analytics is None:
+            self.analytics = RunAnalytics()
+        self.analytics.refresh()
+        version = self.analytics.version
+        if name is None or (name, version) in self.figures:
+            return version, None
+        return version, CHARTS[name][0](self.analytics)
+
+    def in_background(self, name, done, message):
+        """load_chart(name) on the worker; done(result) back on the Tk thread."""
+        self.status.config(text=message)
+        future = self.worker.submit(self.load_chart, name)
+
+        def poll():
+            if not future.done():
+                self.after(POLL_MS, poll)
+                return
+            self.status.config(text="")
+            done(future.result())
+        self.after(POLL_MS, poll)
 
+    def show_plot(self):
         plot_name = self.selected.get()
-        fig = self.plot_funcs[plot_name]()
-        canvas = FigureCanvasTkAgg(fig, master=self.canvas_frame)
-        canvas.draw()
+        self.request += 1
+        request = self.request
+        self.in_background(plot_name, lambda result: self.present(request, plot_name, *result),
+                           f"Loading {plot_name}...")
+
+    def present(self, request, plot_name, version, chart_data):
+        if request != self.request:  # a newer chart was picked meanwhile
+            return
+        key = (plot_name, version)
+        canvas = self.figures.get(key)
+        if canvas is None:
+            if chart_data is None:  # dropped from the cache since the worker looked
+                self.show_plot()
+                return
+            canvas = FigureCanvasTkAgg(CHARTS[plot_name][1](chart_data), master=self.canvas_frame)
+            canvas.draw()
+            self.figures[key] = canvas
+            while len(self.figures) > FIGURE_CACHE_SIZE:
+                _, old = self.figures.popitem(last=False)
+                old.get_tk_widget().destroy()
+        self.figures.move_to_end(key)
+
+        if self.shown is not None and self.shown is not canvas:
+            self.shown.get_tk_widget().pack_forget()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.shown = canvas
+
+    def close(self):
+        self.worker.shutdown(wait=False, cancel_futures=True)
+        self.destroy()
 
 if __name__ == "__main__":
     app = App()
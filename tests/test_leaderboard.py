@@ -0,0 +1,33 @@
+from leaderboard import Leaderboard, class_board, SECS, WON
+from runstore import RunStore
+
+
+def board_of(tmp_path, rows):
+    store = RunStore(str(tmp_path / 'runs.db'))
+    for row in rows:
+        store.add(row)
+    store.close()
+    leaderboard = Leaderboard(store)
+    leaderboard.update()
+    return leaderboard
+
+
+def test_fastest_ranks_wins_by_speed_then_defeats_by_survival(tmp_path):
+    leaderboard = board_of(tmp_path, [
+        ['a', 4, 'soldier', 1, 'none', 0],
+        ['b', 900, 'knight', 30, 'orc', 1],
+        ['c', 600, 'soldier', 20, 'orc', 0],
+        ['d', 700, 'wizard', 31, 'orc', 1],
+        ['e', 11, 'knight', 2, 'none', 0],
+    ])
+    fastest = leaderboard.board('fastest')
+    assert [(run[SECS], run[WON]) for run in fastest] == [(700, 1), (900, 1), (600, 0), (11, 0), (4, 0)]
+
+
+def test_class_board_without_wins_puts_longest_survival_first(tmp_path):
+    leaderboard = board_of(tmp_path, [
+        ['a', 4, 'soldier', 1, 'none', 0],
+        ['b', 300, 'soldier', 9, 'none', 0],
+        ['c', 45, 'soldier', 3, 'none', 0],
+    ])
+    assert [run[SECS] for run in leaderboard.board(class_board('soldier'))] == [300, 45, 4]
@@ -0,0 +1,33 @@
+import pytest
+
+from controls import ScriptedControls
+from replay import RecordingControls, Replay
+
+
+class WindowClosed(ScriptedControls):
+    """Stands in for a window close inside a UILoop menu."""
+    def choose_class(self, game):
+        raise SystemExit
+
+
+def test_recording_survives_exit_from_a_menu(tmp_path):
+    path = tmp_path / 'run.tlcr'
+    controls = RecordingControls(WindowClosed([]), path, 42, 60, 'tester')
+    for _ in range(3):
+        controls.update(None)
+    with pytest.raises(SystemExit):
+        try:
+            controls.choose_class(None)
+        finally:
+            controls.finish(None)  # what main does around Game.run
+    replay = Replay.load(path)
+    assert (replay.seed, replay.player_name, len(replay.frames)) == (42, 'tester', 3)
+
+
+def test_finish_saves_once(tmp_path):
+    path = tmp_path / 'run.tlcr'
+    controls = RecordingControls(ScriptedControls([]), path, 1, 60)
+    controls.finish(None)
+    controls.update(None)  # a frame after the save is not written over it
+    controls.finish(None)
+    assert len(Replay.load(path).frames) == 0
@@ -0,0 +1,17 @@
+from collections import Counter
+
+from simulate import plan_runs, JOBS
+
+
+def test_plan_runs_covers_every_job_policy_pair():
+    plan = plan_runs(100, 7, ['knight', 'wizard'], ['random', 'hunter'], 60)
+    pairs = Counter((job, policy) for _seed, job, policy, _secs in plan)
+    assert pairs == {('knight', 'random'): 25, ('knight', 'hunter'): 25,
+                     ('wizard', 'random'): 25, ('wizard', 'hunter'): 25}
+
+
+def test_plan_runs_uneven_lists():
+    plan = plan_runs(16, 0, list(JOBS), ['idle', 'hunter'], 60)
+    assert {(job, policy) for _seed, job, policy, _secs in plan} == \
+        {(job, policy) for job in JOBS for policy in ('idle', 'hunter')}
+    assert [seed for seed, *_ in plan] == list(range(16))
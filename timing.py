@@ -0,0 +1,37 @@
+# timing.py
+import pygame
+
+
+class RealClock:
+    """Wall-clock game time - pygame ticks, frames paced by pygame.time.Clock."""
+    def __init__(self):
+        self._clock = pygame.time.Clock()
+
+    def get_ticks(self):
+        return pygame.time.get_ticks()
+
+    def tick(self, fps):
+        """Wait for the next frame, return the elapsed ms (like Clock.tick)."""
+        return self._clock.tick(fps)
+
+
+class FixedStepClock:
+    """Simulated game time that advances by exactly one step per frame."""
+    def __init__(self, fps=60, realtime=False):
+        self.step_ms = 1000 / fps
+        self.now = 0.0
+        # realtime=True still paces frames for a window (e.g. watching a replay)
+        self._clock = pygame.time.Clock() if realtime else None
+
+    def get_ticks(self):
+        return int(self.now)
+
+    def tick(self, fps=None):
+        if self._clock:
+            self._clock.tick(fps or 1000 / self.step_ms)
+        self.now += self.step_ms
+        return self.step_ms
+
+
+# Used by sprites created without an explicit clock.
+REAL_CLOCK = RealClock()
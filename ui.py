@@ -0,0 +1,75 @@
+# ui.py
+import sys
+import pygame
+from hud import get_font
+from settings import MENU_MAX_FPS
+
+
+class Button:
+    """A filled rect whose label is rendered once, not every frame."""
+    def __init__(self, rect, text, font_size, label_offset, color=(200, 200, 200),
+                 text_color=(0, 0, 0)):
+        self.rect = rect
+        self.color = color
+        self.label = get_font(font_size).render(text, True, text_color)
+        self.label_pos = rect.move(label_offset).topleft
+
+    def draw(self, screen):
+        pygame.draw.rect(screen, self.color, self.rect)
+        screen.blit(self.label, self.label_pos)
+
+    def clicked(self, event):
+        return (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1
+                and self.rect.collidepoint(event.pos))
+
+
+class UILoop:
+    """
+    Event-driven loop for menus. It sleeps in pygame.event.wait() until input
+    arrives, and only redraws + flips the rects that were invalidated (the
+    whole screen on the first frame or when the window is exposed).
+    draw(screen) paints the full screen; it is clipped to each dirty rect.
+    """
+    def __init__(self, screen, draw, max_fps=MENU_MAX_FPS):
+        self.screen = screen
+        self.draw = draw
+        self.max_fps = max_fps
+        self.clock = pygame.time.Clock()
+        self.dirty = [None]  # None = whole screen
+
+    def invalidate(self, rect=None):
+        self.dirty.append(rect)
+
+    def present(self):
+        if None in self.dirty:
+            self.screen.set_clip(None)
+            self.draw(self.screen)
+            pygame.display.update()
+        else:
+            rects = [r.clip(self.screen.get_rect()) for r in self.dirty]
+            for r in rects:
+                self.screen.set_clip(r)
+                self.draw(self.screen)
+            self.screen.set_clip(None)
+            pygame.display.update(rects)
+        self.dirty.clear()
+        self.clock.tick(self.max_fps)  # caps redraws when input floods in
+
+    def run(self, handle_event):
+        """Feed events to handle_event until it returns something other than None."""
+        while True:
+            if self.dirty:
+                self.present()
+            # sleep until something happens, then drain the queue one event at
+            # a time (events after the one that ends the loop stay queued)
+            event = pygame.event.wait()
+            while event.type != pygame.NOEVENT:
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                if event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                    self.invalidate()
+                result = handle_event(event)
+                if result is not None:
+                    return result
+                event = pygame.event.poll()